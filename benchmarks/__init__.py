@@ -0,0 +1,9 @@
+"""
+Reproducible benchmarks for the puzzle solvers.
+
+Run from the repository root with
+
+    python -m benchmarks [--baseline benchmarks/baseline.json]
+
+to time every strategy on every case of the fixed corpus in corpus.py.
+"""
@@ -0,0 +1,66 @@
+"""
+Command-line entry point: python -m benchmarks --help
+"""
+import argparse
+import os
+import sys
+from benchmarks.runner import run, compare, load, save
+
+
+def main(argv=None):
+    """
+    Run the benchmarks as described by the command-line arguments argv,
+    and return the exit status: 1 if any regression against the baseline
+    was found, else 0.
+
+    @type argv: list[str] | None
+    @rtype: int
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed solves before timing (default 1)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed solves per case (default 5)")
+    parser.add_argument("--only", default=None,
+                        help="run only cases whose case/strategy key "
+                             "contains this")
+    parser.add_argument("--output", default="bench_output.json",
+                        help="where to write results as JSON")
+    parser.add_argument("--baseline", default=None,
+                        help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown of the median before it "
+                             "counts as a regression (default 0.25)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25,
+                        help="allowed growth of the peak resident set "
+                             "size before it counts as a regression "
+                             "(default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results to --baseline instead of "
+                             "comparing")
+    args = parser.parse_args(argv)
+
+    def report(key, result):
+        print("{:<50} median {:9.4f}s  p95 {:9.4f}s  rss {:7d}kB  "
+              "length {}".format(key, result["median"], result["p95"],
+                                 result["peak_rss_kb"],
+                                 result["path_length"]))
+        sys.stdout.flush()
+
+    results = run(args.warmup, args.repeat, args.only, report)
+    save(results, args.output)
+    if args.baseline is None:
+        return 0
+    if args.update_baseline or not os.path.exists(args.baseline):
+        save(results, args.baseline)
+        print("baseline written to {}".format(args.baseline))
+        return 0
+    regressions = compare(results, load(args.baseline), args.tolerance,
+                          args.rss_tolerance)
+    for line in regressions:
+        print("REGRESSION " + line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+The fixed corpus of puzzles benchmarked by the benchmarks package.
+"""
+from random import Random
+from lexicon import load_lexicon
+from sudoku_puzzle import SudokuPuzzle
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from word_ladder_puzzle import WordLadderPuzzle
+from mn_puzzle import MNPuzzle
+
+# the three 9x9 puzzles solved in sudoku_puzzle's __main__
+SUDOKUS = {
+    "sudoku-star-2015-07-09":
+        ["*", "*", "*", "7", "*", "8", "*", "1", "*",
+         "*", "*", "7", "*", "9", "*", "*", "*", "6",
+         "9", "*", "3", "1", "*", "*", "*", "*", "*",
+         "3", "5", "*", "8", "*", "*", "6", "*", "1",
+         "*", "*", "*", "*", "*", "*", "*", "*", "*",
+         "1", "*", "6", "*", "*", "9", "*", "4", "8",
+         "*", "*", "*", "*", "*", "1", "2", "*", "7",
+         "8", "*", "*", "*", "7", "*", "4", "*", "*",
+         "*", "6", "*", "3", "*", "2", "*", "*", "*"],
+    "sudoku-3-star-2015-11-14":
+        ["*", "*", "*", "9", "*", "2", "*", "*", "*",
+         "*", "9", "1", "*", "*", "*", "6", "3", "*",
+         "*", "3", "*", "*", "7", "*", "*", "8", "*",
+         "3", "*", "*", "*", "*", "*", "*", "*", "8",
+         "*", "*", "9", "*", "*", "*", "2", "*", "*",
+         "5", "*", "*", "*", "*", "*", "*", "*", "7",
+         "*", "7", "*", "*", "8", "*", "*", "4", "*",
+         "*", "4", "5", "*", "*", "*", "8", "1", "*",
+         "*", "*", "*", "3", "*", "6", "*", "*", "*"],
+    "sudoku-4-star-2015-11-14":
+        ["5", "6", "*", "*", "*", "7", "*", "*", "9",
+         "*", "7", "*", "*", "4", "8", "*", "3", "1",
+         "*", "*", "*", "*", "*", "*", "*", "*", "*",
+         "4", "3", "*", "*", "*", "*", "*", "*", "*",
+         "*", "8", "*", "*", "*", "*", "*", "9", "*",
+         "*", "*", "*", "*", "*", "*", "*", "2", "6",
+         "*", "*", "*", "*", "*", "*", "*", "*", "*",
+         "1", "9", "*", "3", "6", "*", "*", "7", "*",
+         "7", "*", "*", "1", "*", "*", "*", "4", "2"]}
+
+# the 5x5 board solved in grid_peg_solitaire_puzzle's __main__
+PEG = [["*", "*", "*", "*", "*"],
+       ["*", "*", "*", "*", "*"],
+       ["*", "*", "*", "*", "*"],
+       ["*", "*", ".", "*", "*"],
+       ["*", "*", "*", "*", "*"]]
+
+# word ladders over words.txt, from the two in the drivers to pairs
+# whose shortest ladders are 8 to 20 steps long
+LADDERS = [("cove", "cost"), ("same", "cost"), ("ape", "ohm"),
+           ("cove", "quay"), ("same", "chum"), ("black", "magma"),
+           ("stone", "rogue"), ("smile", "rogue")]
+
+# (rows, columns, scrambling moves, seed) for each MNPuzzle
+SLIDING = [(3, 3, 60, 1), (3, 3, 200, 2), (3, 4, 60, 3), (4, 4, 40, 4),
+           (4, 4, 80, 5)]
+
+# strategies run on each kind of case, by solver name in puzzle_tools
+STRATEGIES = {
+    "sudoku": ["depth_first_solve"],
+    "peg": ["depth_first_solve"],
+    "ladder": ["breadth_first_solve", "bidirectional_solve", "astar_solve",
+               "depth_first_solve"],
+    "sliding": ["bidirectional_solve", "astar_solve", "ida_star_solve"],
+    "sliding-3x3": ["breadth_first_solve", "bidirectional_solve",
+                    "astar_solve", "ida_star_solve"]}
+
+
+def load_words(path="words.txt"):
+    """
+    Return the shared Lexicon of the words in the file at path.
+
+    @type path: str
+    @rtype: Lexicon
+    """
+    return load_lexicon(path)
+
+
+def scrambled(rows, columns, moves, seed):
+    """
+    Return an MNPuzzle reached from the solved rows x columns board by
+    moves random slides chosen by Random(seed), so it is solvable.
+
+    @type rows: int
+    @type columns: int
+    @type moves: int
+    @type seed: int
+    @rtype: MNPuzzle
+
+    >>> scrambled(2, 2, 0, 0).from_grid
+    (('1', '2'), ('3', '*'))
+    >>> scrambled(3, 3, 20, 7) == scrambled(3, 3, 20, 7)
+    True
+    """
+    cells = [str(i + 1) for i in range(rows * columns - 1)] + ["*"]
+    goal = tuple([tuple(cells[r * columns:(r + 1) * columns])
+                  for r in range(rows)])
+    rng, puzzle = Random(seed), MNPuzzle(goal, goal)
+    for _ in range(moves):
+        puzzle = rng.choice(puzzle.extensions())
+    return MNPuzzle(puzzle.from_grid, goal)
+
+
+def names():
+    """
+    Return (name, kind) for every case in the corpus, where kind is a key
+    of STRATEGIES, without building any of their puzzles.
+
+    @rtype: list[(str, str)]
+
+    >>> names()[3]
+    ('peg-5x5', 'peg')
+    >>> len(names())
+    17
+    """
+    result = [(name, "sudoku") for name in SUDOKUS]
+    result.append(("peg-5x5", "peg"))
+    result.extend([("ladder-{}-{}".format(a, b), "ladder")
+                   for a, b in LADDERS])
+    for rows, columns, moves, seed in SLIDING:
+        kind = "sliding-3x3" if (rows, columns) == (3, 3) else "sliding"
+        result.append(("mn-{}x{}-{}-seed{}".format(rows, columns, moves,
+                                                   seed), kind))
+    return result
+
+
+def build(name, word_set=None):
+    """
+    Return the puzzle of the case called name in the corpus.  Only
+    ladder cases need words, and load them from words.txt unless
+    word_set is given.
+
+    @type name: str
+    @type word_set: set[str] | Lexicon | None
+    @rtype: Puzzle
+
+    >>> print(build("mn-3x3-60-seed1").to_grid)
+    (('1', '2', '3'), ('4', '5', '6'), ('7', '8', '*'))
+    >>> build("ladder-cove-cost", {"cove", "cost"}).state_key()
+    'cove'
+    """
+    if name in SUDOKUS:
+        digits = {"1", "2", "3", "4", "5", "6", "7", "8", "9"}
+        return SudokuPuzzle(9, SUDOKUS[name], digits)
+    if name == "peg-5x5":
+        return GridPegSolitairePuzzle([row[:] for row in PEG],
+                                      {"*", ".", "#"})
+    for a, b in LADDERS:
+        if name == "ladder-{}-{}".format(a, b):
+            if word_set is None:
+                word_set = load_words()
+            return WordLadderPuzzle(a, b, word_set)
+    for rows, columns, moves, seed in SLIDING:
+        if name == "mn-{}x{}-{}-seed{}".format(rows, columns, moves, seed):
+            return scrambled(rows, columns, moves, seed)
+    raise ValueError("no case called {} in the corpus".format(name))
+
+
+def cases(word_set=None):
+    """
+    Return (name, kind, puzzle) for every case in the corpus, where kind
+    is a key of STRATEGIES.
+
+    @type word_set: set[str] | Lexicon | None
+    @rtype: list[(str, str, Puzzle)]
+    """
+    if word_set is None:
+        word_set = load_words()
+    return [(name, kind, build(name, word_set)) for name, kind in names()]
@@ -0,0 +1,178 @@
+"""
+Timing, summarising and comparing benchmark runs.
+"""
+import json
+import os
+import platform
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter, strftime
+import puzzle_tools
+from benchmarks.corpus import build, names, STRATEGIES
+
+
+def percentile(values, fraction):
+    """
+    Return the nearest-rank percentile fraction of values.
+
+    @type values: list[float]
+    @type fraction: float
+    @rtype: float
+
+    >>> percentile([3.0, 1.0, 2.0], 0.5)
+    2.0
+    >>> percentile([1.0, 2.0, 3.0, 4.0, 5.0], 0.95)
+    5.0
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def measure(name, strategy, warmup, repeat):
+    """
+    Return the timings of solving corpus case name with the puzzle_tools
+    solver strategy repeat times, after warmup untimed solves.
+
+    Meant to run in a fresh process, so that the peak resident set size
+    reported belongs to this case alone: only its puzzle is built, and
+    words.txt is only loaded for ladders.
+
+    @type name: str
+    @type strategy: str
+    @type warmup: int
+    @type repeat: int
+    @rtype: dict[str, Any]
+    """
+    puzzle = build(name)
+    solve = getattr(puzzle_tools, strategy)
+    for _ in range(warmup):
+        solve(puzzle)
+    times, solution = [], None
+    for _ in range(repeat):
+        start = perf_counter()
+        solution = solve(puzzle)
+        times.append(perf_counter() - start)
+    length = None
+    if solution is not None:
+        length = 0
+        while solution.children:
+            solution, length = solution.children[0], length + 1
+    return {"median": percentile(times, 0.5), "p95": percentile(times, 0.95),
+            "times": times, "path_length": length,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run(warmup=1, repeat=5, only=None, report=None):
+    """
+    Return benchmark results for every case and strategy in the corpus,
+    keyed by "case/strategy", each measured in its own process.
+
+    If only is given, just the keys containing it are run.  report is
+    called with each key and its result as they finish.
+
+    @type warmup: int
+    @type repeat: int
+    @type only: str | None
+    @type report: ((str, dict[str, Any]) -> Any) | None
+    @rtype: dict[str, Any]
+    """
+    results = {}
+    # fix string hashing in the measuring processes, so that set order,
+    # and with it the search order, is the same from run to run; they
+    # inherit the environment, which is put back afterwards
+    seed = os.environ.get("PYTHONHASHSEED")
+    os.environ["PYTHONHASHSEED"] = seed or "0"
+    try:
+        # one process per measurement, so peak memory is not carried over
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn"),
+                                 max_tasks_per_child=1) as pool:
+            for name, kind in names():
+                for strategy in STRATEGIES[kind]:
+                    key = "{}/{}".format(name, strategy)
+                    if only is not None and only not in key:
+                        continue
+                    results[key] = pool.submit(measure, name, strategy,
+                                               warmup, repeat).result()
+                    if report is not None:
+                        report(key, results[key])
+    finally:
+        if seed is None:
+            del os.environ["PYTHONHASHSEED"]
+        else:
+            os.environ["PYTHONHASHSEED"] = seed
+    return {"meta": {"python": sys.version.split()[0],
+                     "platform": platform.platform(),
+                     "date": strftime("%Y-%m-%d %H:%M:%S"),
+                     "warmup": warmup, "repeat": repeat},
+            "results": results}
+
+
+def compare(results, baseline, tolerance, rss_tolerance=0.25):
+    """
+    Return a line describing each result whose median time is more than
+    tolerance slower than in baseline, whose peak resident set size is
+    more than rss_tolerance larger, or whose path length changed.
+
+    @type results: dict[str, Any]
+    @type baseline: dict[str, Any]
+    @type tolerance: float
+    @type rss_tolerance: float
+    @rtype: list[str]
+
+    >>> old = {"results": {"a/bfs": {"median": 1.0, "path_length": 3,
+    ...                              "peak_rss_kb": 10000}}}
+    >>> new = {"results": {"a/bfs": {"median": 1.5, "path_length": 3,
+    ...                              "peak_rss_kb": 13000}}}
+    >>> for line in compare(new, old, 0.25):
+    ...     print(line)
+    a/bfs: median 1.5000s vs baseline 1.0000s (+50%)
+    a/bfs: peak rss 13000kB vs baseline 10000kB (+30%)
+    >>> compare(new, old, 0.6, 0.5)
+    []
+    """
+    regressions = []
+    for key, result in sorted(results["results"].items()):
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        if result["median"] > old["median"] * (1 + tolerance):
+            regressions.append(
+                "{}: median {:.4f}s vs baseline {:.4f}s ({:+.0%})".format(
+                    key, result["median"], old["median"],
+                    result["median"] / old["median"] - 1))
+        if result["peak_rss_kb"] > old["peak_rss_kb"] * (1 + rss_tolerance):
+            regressions.append(
+                "{}: peak rss {}kB vs baseline {}kB ({:+.0%})".format(
+                    key, result["peak_rss_kb"], old["peak_rss_kb"],
+                    result["peak_rss_kb"] / old["peak_rss_kb"] - 1))
+        if result["path_length"] != old["path_length"]:
+            regressions.append("{}: path length {} vs baseline {}".format(
+                key, result["path_length"], old["path_length"]))
+    return regressions
+
+
+def load(path):
+    """
+    Return the benchmark results saved as JSON at path.
+
+    @type path: str
+    @rtype: dict[str, Any]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(results, path):
+    """
+    Save benchmark results as JSON at path.
+
+    @type results: dict[str, Any]
+    @type path: str
+    @rtype: None
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -23,6 +23,14 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
         self._marker, self._marker_set = marker, marker_set
+        # bit r * columns + c of _pegs is set when row r, column c holds
+        # a peg, and of _holes when it is not unused
+        self._pegs = self._holes = 0
+        for i, x in enumerate([x for row in marker for x in row]):
+            if x == "*":
+                self._pegs |= 1 << i
+            if x != "#":
+                self._holes |= 1 << i
 
     # TODO
     # implement __eq__, __str__ methods
@@ -39,11 +47,35 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> grid += [["*", "*", "*", "*"], ["*", "*", "*", "*"]]
         >>> gpsp1 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
         >>> gpsp2 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
-        >>> repr(gpsp1) == repr(gpsp2)
+        >>> gpsp1 == gpsp2
         True
+        >>> grid = [["*", "*", "*", "."], ["*", "*", "*", "*"]]
+        >>> grid += [["*", "*", "*", "*"], ["*", "*", "*", "*"]]
+        >>> gpsp3 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> gpsp1 == gpsp3
+        False
+        """
+        return (Puzzle.__eq__(self, other) and
+                self._holes == other._holes and
+                len(self._marker[0]) == len(other._marker[0]) and
+                self._marker_set == other._marker_set)
+
+    __hash__ = Puzzle.__hash__
+
+    def state_key(self):
         """
-        return type(self), self._marker, self._marker_set == type(other), \
-               other._marker, other._marker_set
+        Return a hashable key for the markers of GridPegSolitairePuzzle
+        self: the int with bit r * columns + c set for each peg at row r,
+        column c.  Unused positions never change, so they are left out.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "*", ".", "*"], ["#", "*", "*", "*"]]
+        >>> bin(GridPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key())
+        '0b11101011'
+        """
+        return self._pegs
 
     def __str__(self):
         """
@@ -81,12 +113,13 @@ class GridPegSolitairePuzzle(Puzzle):
     # legal extensions consist of all configurations that can be reached by
     # making a single jump from this configuration
 
-    def extensions(self):
+    def iter_extensions(self):
         """
-        Return list of legal extensions of GridPegSolitairePuzzle self.
+        Yield the legal extensions of GridPegSolitairePuzzle self one at
+        a time.
 
         @type self: GridPegSolitairePuzzle
-        @rtype: list[GridPegSolitairePuzzle]
+        @rtype: generator[GridPegSolitairePuzzle]
 
         >>> grid = [['*', '.', '*', '*'], ['*', '*', '*', '*']]
         >>> grid += [['*', '*', '*', '*'], ['*', '*', '*', '*']]
@@ -95,48 +128,83 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> gpsp1.extensions() == gpsp2.extensions()
         True
         """
-        # finding empty positions
-        empty = []
-        extensions = []
-        for i in range(len(self._marker)):
-            for j in range(len(self._marker[i])):
-                if self._marker[i][j] == '.':
-                    row = i
-                    column = j
-                    empty.append((row, column))
-        for dot in empty:
-            row = dot[0]
-            column = dot[1]
-            # for top
-            if row - 2 >= 0 and self._marker[row - 2][column] == '*' and \
-               self._marker[row - 1][column] == '*':
-                # hard copy
-                new = [x.copy() for x in self._marker]
-                new[row - 1][column], new[row][column], new[row - 2][column] = \
-                    '.', '*', '.'
-                extensions.append(GridPegSolitairePuzzle(new, self._marker_set))
-            # for bottom
-            if row + 2 < len(self._marker) and self._marker[row + 2][column] \
-                    == '*' and self._marker[row + 1][column] == '*':
-                new = [x.copy() for x in self._marker]
-                new[row + 1][column], new[row][column], new[row + 2][column] = \
-                    '.', '*', '.'
-                extensions.append(GridPegSolitairePuzzle(new, self._marker_set))
-            # for left
-            if column - 2 >= 0 and self._marker[row][column - 2] == '*' and \
-               self._marker[row][column - 2] == '*':
-                new = [x.copy() for x in self._marker]
-                new[row][column], new[row][column - 1], new[row][column - 2] = \
-                    '*', '.', '.'
-                extensions.append(GridPegSolitairePuzzle(new, self._marker_set))
-            # for right
-            if column + 2 < len(self._marker[0]) and \
-               self._marker[row][column + 2] == '*' and \
-               self._marker[row][column + 1] == '*':
-                new = [x.copy() for x in self._marker]
-                new[row][column], new[row][column + 1], new[row][column + 2] = \
-                    '*', '.', '.'
-        return extensions
+        for jump in self.moves():
+            child = self.copy()
+            child.apply(jump)
+            yield child
+
+    def moves(self):
+        """
+        Return the jumps that can be made in GridPegSolitairePuzzle self,
+        in the order of its extensions: by the empty position jumped to,
+        then from above, below, the left and the right.
+
+        A jump is (mask, pegs, to, over, from): to, over and from are the
+        (row, column) of its positions, mask has their bits, and pegs the
+        bits of over and from.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: list[(int, int, (int, int), (int, int), (int, int))]
+
+        >>> grid = [["*", "*", "."], [".", "#", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> [jump[2:] for jump in gpsp.moves()]
+        [((0, 2), (0, 1), (0, 0))]
+        """
+        jumps = _jumps(len(self._marker), len(self._marker[0]))
+        pegs, empty, moves = self._pegs, self._holes & ~self._pegs, []
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            for jump in jumps[low.bit_length() - 1]:
+                if pegs & jump[1] == jump[1]:
+                    moves.append(jump)
+        return moves
+
+    def apply(self, move):
+        """
+        Make jump move in GridPegSolitairePuzzle self, a copy.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: (int, int, (int, int), (int, int), (int, int))
+        @rtype: None
+
+        >>> grid = [["*", "*", "."], [".", "#", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"}).copy()
+        >>> gpsp.apply(gpsp.moves()[0])
+        >>> gpsp._marker, gpsp.is_solved()
+        ([['.', '.', '*'], ['.', '#', '*']], False)
+        """
+        _, _, (r, c), (over_r, over_c), (from_r, from_c) = move
+        self._pegs ^= move[0]
+        self._marker[r][c] = "*"
+        self._marker[over_r][over_c] = self._marker[from_r][from_c] = "."
+
+    def undo(self, move):
+        """
+        Take back jump move in GridPegSolitairePuzzle self.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: (int, int, (int, int), (int, int), (int, int))
+        @rtype: None
+        """
+        _, _, (r, c), (over_r, over_c), (from_r, from_c) = move
+        self._pegs ^= move[0]
+        self._marker[r][c] = "."
+        self._marker[over_r][over_c] = self._marker[from_r][from_c] = "*"
+
+    def copy(self):
+        """
+        Return a copy of GridPegSolitairePuzzle self with its own markers.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: GridPegSolitairePuzzle
+        """
+        copy = GridPegSolitairePuzzle.__new__(GridPegSolitairePuzzle)
+        copy._marker = [row.copy() for row in self._marker]
+        copy._marker_set = self._marker_set
+        copy._pegs, copy._holes = self._pegs, self._holes
+        return copy
 
     # TODO
     # override is_solved
@@ -155,10 +223,43 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> gpsp.is_solved()
         True
         """
-        c = 0
-        for i in range(len(self._marker)):
-            c += self._marker[i].count('*')
-        return c == 1
+        return self._pegs.bit_count() == 1
+
+
+def _jumps(rows, columns):
+    """
+    Return, for each position of a grid of rows x columns, the jumps to
+    it from above, below, the left and the right that stay on the grid,
+    building them only the first time they are asked for.  See
+    GridPegSolitairePuzzle.moves.
+
+    @type rows: int
+    @type columns: int
+    @rtype: list[list[(int, int, (int, int), (int, int), (int, int))]]
+
+    >>> [jump[2:] for jump in _jumps(1, 3)[0]]
+    [((0, 0), (0, 1), (0, 2))]
+    """
+    if (rows, columns) not in _jump_cache:
+        jumps = []
+        for r in range(rows):
+            for c in range(columns):
+                jumps.append([])
+                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                    if (0 <= r + 2 * dr < rows and
+                            0 <= c + 2 * dc < columns):
+                        over = (r + dr, c + dc)
+                        from_ = (r + 2 * dr, c + 2 * dc)
+                        pegs = ((1 << over[0] * columns + over[1]) |
+                                (1 << from_[0] * columns + from_[1]))
+                        jumps[-1].append((pegs | 1 << r * columns + c,
+                                          pegs, (r, c), over, from_))
+        _jump_cache[(rows, columns)] = jumps
+    return _jump_cache[(rows, columns)]
+
+
+# by (rows, columns)
+_jump_cache = {}
 
 
 if __name__ == "__main__":
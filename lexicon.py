@@ -0,0 +1,340 @@
+"""
+Word lists indexed for finding the words one letter change away.
+"""
+import marshal
+import mmap
+import os
+import sys
+from weakref import ref
+
+# the letters a word ladder step may change a letter to
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class Lexicon:
+    """
+    A set of words kept apart by length, with an index from wildcard
+    patterns such as "h*t" to the words matching them, built for each
+    word length the first time words of that length are looked up.
+    """
+
+    def __init__(self, words):
+        """
+        Create a Lexicon self of the words in words.
+
+        @type self: Lexicon
+        @type words: iterable[str]
+        @rtype: None
+        """
+        # word length -> frozenset of words
+        self._by_length = {}
+        for word in words:
+            self._by_length.setdefault(len(word), set()).add(word)
+        for length in self._by_length:
+            self._by_length[length] = frozenset(self._by_length[length])
+        # word length -> pattern -> sorted words matching it
+        self._patterns = {}
+        # word length -> word -> label of its connected component
+        self._components = {}
+        # the arguments of load_lexicon this was loaded with, if it was
+        self._source = None
+
+    def __contains__(self, word):
+        """
+        Return whether word is in Lexicon self.
+
+        @type self: Lexicon
+        @type word: str
+        @rtype: bool
+
+        >>> "hot" in Lexicon({"hot", "hat"}), "hit" in Lexicon({"hot"})
+        (True, False)
+        """
+        return word in self._by_length.get(len(word), ())
+
+    def __len__(self):
+        """
+        Return the number of words in Lexicon self.
+
+        @type self: Lexicon
+        @rtype: int
+
+        >>> len(Lexicon({"hot", "hat"}))
+        2
+        """
+        return sum([len(words) for words in self._by_length.values()])
+
+    def __iter__(self):
+        """
+        Return an iterator over the words of Lexicon self.
+
+        @type self: Lexicon
+        @rtype: iterator[str]
+        """
+        return (word for words in self._by_length.values() for word in words)
+
+    def __reduce__(self):
+        """
+        Return how to pickle Lexicon self: as a call to load_lexicon if
+        it was loaded by it, so an unpickling process uses its own shared
+        copy, or else by its words alone, leaving the index to be rebuilt
+        when needed.
+
+        @type self: Lexicon
+        @rtype: tuple
+        """
+        if self._source is not None:
+            return (load_lexicon, self._source)
+        return (Lexicon, (list(self),))
+
+    def words(self, length):
+        """
+        Return the words of Lexicon self with length letters.
+
+        @type self: Lexicon
+        @type length: int
+        @rtype: frozenset[str]
+
+        >>> sorted(Lexicon({"hot", "hat", "heat"}).words(3))
+        ['hat', 'hot']
+        """
+        return self._by_length.get(length, frozenset())
+
+    def neighbours(self, word):
+        """
+        Return the words of Lexicon self that word becomes by changing
+        one of its letters to a letter of LETTERS, in order of the
+        position changed, then of the new letter.
+
+        @type self: Lexicon
+        @type word: str
+        @rtype: list[str]
+
+        >>> lex = Lexicon({"hot", "hat", "hit", "cot", "dog", "Hot"})
+        >>> lex.neighbours("hot")
+        ['cot', 'hat', 'hit']
+        >>> lex.neighbours("Hot")
+        ['cot', 'hot']
+        """
+        patterns = self._index(len(word))
+        result = []
+        for i in range(len(word)):
+            for other in patterns.get(word[:i] + "*" + word[i + 1:], ()):
+                if other != word:
+                    result.append(other)
+        return result
+
+    def component(self, word):
+        """
+        Return the label of the connected component of word in the graph
+        joining words of Lexicon self one letter change apart, or None if
+        word is not in self.  Words of different lengths are never in the
+        same component, and two words can only be joined by a word
+        ladder if they are in the same one.
+
+        @type self: Lexicon
+        @type word: str
+        @rtype: int | None
+
+        >>> lex = Lexicon({"hot", "hat", "cat", "dog", "dot", "pig"})
+        >>> lex.component("cat") == lex.component("dog")
+        True
+        >>> lex.component("cat") == lex.component("pig")
+        False
+        >>> print(lex.component("cow"))
+        None
+        """
+        if word not in self:
+            return None
+        if len(word) not in self._components:
+            self._components[len(word)] = self._label(len(word))
+        return self._components[len(word)][word]
+
+    def _label(self, length):
+        """
+        Return the component label of each word of Lexicon self with
+        length letters, numbering the components from 0.
+
+        @type self: Lexicon
+        @type length: int
+        @rtype: dict[str, int]
+        """
+        # union-find over words, with path halving
+        parent = {word: word for word in self.words(length)}
+
+        def find(word):
+            while parent[word] != word:
+                parent[word] = parent[parent[word]]
+                word = parent[word]
+            return word
+
+        for word in parent:
+            for other in self.neighbours(word):
+                root, other_root = find(word), find(other)
+                if root != other_root:
+                    parent[other_root] = root
+        labels = {}
+        for word in sorted(parent):
+            labels.setdefault(find(word), len(labels))
+        return {word: labels[find(word)] for word in parent}
+
+    def _index(self, length):
+        """
+        Return the pattern index of the words of Lexicon self with length
+        letters, building it if it has not been yet.
+
+        A word is filed under the pattern for position i only if its
+        letter there is in LETTERS, since no step can change a letter
+        into anything else.
+
+        @type self: Lexicon
+        @type length: int
+        @rtype: dict[str, list[str]]
+        """
+        if length not in self._patterns:
+            patterns = {}
+            for word in self.words(length):
+                for i in range(length):
+                    if word[i] in LETTERS:
+                        patterns.setdefault(word[:i] + "*" + word[i + 1:],
+                                            []).append(word)
+            for bucket in patterns.values():
+                bucket.sort()
+            self._patterns[length] = patterns
+        return self._patterns[length]
+
+
+def load_lexicon(path="words.txt", cache=None):
+    """
+    Return the Lexicon of the words in the file at path, one per line or
+    separated by spaces, keeping only those made of LETTERS alone, since
+    no word ladder step can reach the others.  Each word is interned.
+
+    The file is read once per process: later calls with the same path,
+    whatever their cache, return the same Lexicon.  If cache is given, it
+    names a binary file the kept words are saved to, grouped by length
+    with the labels of their connected components, and loaded from while
+    it is newer than the file at path, to speed up that first read.  The
+    pattern index is not saved: loading it takes about as long as
+    building it.
+
+    @type path: str
+    @type cache: str | None
+    @rtype: Lexicon
+
+    >>> load_lexicon() is load_lexicon()
+    True
+    >>> import os, tempfile
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     cached = load_lexicon(cache=os.path.join(directory, "words.bin"))
+    >>> cached is load_lexicon()
+    True
+    >>> "cost" in load_lexicon(), "A's" in load_lexicon()
+    (True, False)
+    """
+    key = os.path.realpath(path)
+    if key not in _loaded:
+        lexicon = None
+        if cache is not None and os.path.exists(cache) and (
+                os.path.getmtime(cache) >= os.path.getmtime(path)):
+            lexicon = _read_cache(cache)
+        if lexicon is None:
+            with open(path, "r", encoding="utf-8") as f:
+                lexicon = Lexicon([sys.intern(word)
+                                   for word in f.read().split()
+                                   if word.strip(LETTERS) == ""])
+            if cache is not None:
+                _write_cache(lexicon, cache)
+        lexicon._source = (path, cache)
+        _loaded[key] = lexicon
+    return _loaded[key]
+
+
+def _read_cache(cache):
+    """
+    Return the Lexicon saved in the cache file at cache, or None if it
+    is not a Lexicon cache written by _write_cache.
+
+    @type cache: str
+    @rtype: Lexicon | None
+    """
+    try:
+        with open(cache, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            version, by_length, components = marshal.loads(m)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != _CACHE_VERSION:
+        return None
+    lexicon = Lexicon(())
+    for length, words in by_length.items():
+        words = [sys.intern(word) for word in words]
+        lexicon._by_length[length] = frozenset(words)
+        lexicon._components[length] = dict(zip(words, components[length]))
+    return lexicon
+
+
+def _write_cache(lexicon, cache):
+    """
+    Save the words of Lexicon lexicon, grouped by length, and the
+    labels of their components to the cache file at cache.
+
+    @type lexicon: Lexicon
+    @type cache: str
+    @rtype: None
+    """
+    by_length = {length: sorted(lexicon.words(length))
+                 for length in lexicon._by_length}
+    components = {length: [lexicon.component(word) for word in words]
+                  for length, words in by_length.items()}
+    # write then rename, so a reader never sees half a cache
+    with open(cache + ".tmp", "wb") as f:
+        marshal.dump((_CACHE_VERSION, by_length, components), f)
+    os.replace(cache + ".tmp", cache)
+
+
+def lexicon_of(words):
+    """
+    Return words if it is a Lexicon, or else the Lexicon of set words,
+    made the first time it is asked for and reused while words exists.
+    Other collections of words, which cannot be watched for as long as
+    they exist, get a new Lexicon every time.
+
+    @type words: Lexicon | set[str] | iterable[str]
+    @rtype: Lexicon
+
+    >>> ws = {"hot", "hat"}
+    >>> lexicon_of(ws) is lexicon_of(ws)
+    True
+    >>> lexicon_of(lexicon_of(ws)) is lexicon_of(ws)
+    True
+    >>> lexicon_of(["hot", "hat"]).neighbours("hot")
+    ['hat']
+    """
+    if isinstance(words, Lexicon):
+        return words
+    if not isinstance(words, (set, frozenset)):
+        return Lexicon(words)
+    entry = _lexicons.get(id(words))
+    if entry is not None and entry[0]() is words:
+        return entry[1]
+    key = id(words)
+
+    def forget(reference):
+        # drop the entry once words is gone, unless its id was reused
+        if _lexicons.get(key, (None,))[0] is reference:
+            del _lexicons[key]
+
+    lexicon = Lexicon(words)
+    _lexicons[key] = (ref(words, forget), lexicon)
+    return lexicon
+
+
+# (weak reference to word set, its Lexicon), by id of the word set
+_lexicons = {}
+
+# Lexicons read by load_lexicon, by resolved path
+_loaded = {}
+
+# changes whenever the layout of cache files does
+_CACHE_VERSION = 2
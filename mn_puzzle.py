@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from bisect import bisect_left
 
 
 class MNPuzzle(Puzzle):
@@ -23,7 +24,27 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        self.to_grid = to_grid
+        symbols = {d for r in from_grid + to_grid for d in r}
+        self._layout = _layout(self.n, self.m, symbols)
+        # the tiles are packed into one int, _layout.bits bits per
+        # position, holding 0 for "*"; _blank is the position of "*"
+        self._state = self._layout.pack(from_grid)
+        self._goal = self._layout.pack(to_grid)
+        self._blank = [d for r in from_grid for d in r].index("*")
+        # whether to_grid is out of reach, once fail_fast has found out;
+        # moves never change it, so extensions inherit it
+        self._unsolvable = None
+
+    @property
+    def from_grid(self):
+        """
+        The current configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+        """
+        return self._layout.unpack(self._state)
 
     # TODO
     # implement __eq__ and __str__
@@ -38,11 +59,41 @@ class MNPuzzle(Puzzle):
 
         >>> p1 = MNPuzzle((("1", "2", "3"), ("4", "*", "5")), (("1", "2", "3"), ("4", "5", "")))
         >>> p2 = MNPuzzle((("1", "2", "3"), ("4", "*", "5")), (("1", "2", "3"), ("4", "5", "")))
-        >>> repr(p1) == repr(p2)
+        >>> p1 == p2
         True
+        >>> p3 = MNPuzzle((("1", "2", "3"), ("4", "5", "*")), (("1", "2", "3"), ("4", "5", "")))
+        >>> p1 == p3
+        False
+        """
+        return (Puzzle.__eq__(self, other) and
+                self._layout is other._layout and
+                self.to_grid == other.to_grid)
+
+    __hash__ = Puzzle.__hash__
+
+    def state_key(self):
         """
-        return (type(self), self.from_grid, self.to_grid == type(other),
-                other.from_grid, self.to_grid)
+        Return a hashable key for the current grid of MNPuzzle self: the
+        tiles packed into an int, the same for MNPuzzles using the same
+        symbols on the same size of board.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> p = MNPuzzle((("1", "*"), ("3", "2")), (("1", "2"), ("3", "*")))
+        >>> hex(p.state_key())
+        '0x2301'
+        """
+        return self._state
+
+    def __reduce__(self):
+        """
+        Return how to pickle MNPuzzle self, by its grids.
+
+        @type self: MNPuzzle
+        @rtype: tuple
+        """
+        return (MNPuzzle, (self.from_grid, self.to_grid))
 
     def __str__(self):
         """
@@ -83,62 +134,112 @@ class MNPuzzle(Puzzle):
     # override extensions
     # legal extensions are configurations that can be reached by swapping one
     # symbol to the left, right, above, or below "*" with "*"
-    def extensions(self):
+    def iter_extensions(self):
         """
-        Return list of extensions of MNPuzzle self.
+        Yield the extensions of MNPuzzle self one at a time.
 
         @type self: MNPuzzle
-        @rtype: list[MNPuzzle]
+        @rtype: generator[MNPuzzle]
 
-        EXAMPLES
+        >>> p = MNPuzzle((("1", "*"), ("3", "2")), (("1", "2"), ("3", "*")))
+        >>> [x.from_grid for x in p.iter_extensions()]
+        [(('*', '1'), ('3', '2')), (('1', '2'), ('3', '*'))]
         """
-        # finding the index of the empty position(row, column)
-        row = 0
-        column = 0
-        for i in range(len(self.from_grid)):
-            if '*' in self.from_grid[i]:
-                row = i
-                column = self.from_grid[i].index('*')
-
-        puzzle_list = []
-        from_l = []
-        # swap on the right
-        if column + 1 < len(self.from_grid[row]):
-            from_l = [list(x) for x in self.from_grid]
-            from_l[row][column], from_l[row][column + 1] = \
-                from_l[row][column + 1], from_l[row][column]
-            for i in range(len(from_l)):
-                from_l[i] = tuple(from_l[i])
-            puzzle_list.append(MNPuzzle(tuple(from_l), self.to_grid))
-
-        # swap on the left
-        if column - 1 > 0:
-            from_l = [list(x) for x in self.from_grid]
-            from_l[row][column], from_l[row][column - 1] = \
-                from_l[row][column - 1], from_l[row][column]
-            for i in range(len(from_l)):
-                from_l[i] = tuple(from_l[i])
-            puzzle_list.append(MNPuzzle(tuple(from_l), self.to_grid))
-
-        # swap on the bottom
-        if row + 1 < len(self.from_grid):
-            from_l = [list(x) for x in self.from_grid]
-            from_l[row][column], from_l[row + 1][column] = \
-                from_l[row + 1][column], from_l[row][column]
-            for i in range(len(from_l)):
-                from_l[i] = tuple(from_l[i])
-            puzzle_list.append(MNPuzzle(tuple(from_l), self.to_grid))
-
-        # swap on the top
-        if row - 1 >= 0:
-            from_l = [list(x) for x in self.from_grid]
-            from_l[row][column], from_l[row - 1][column] = \
-                from_l[row - 1][column], from_l[row][column]
-            for i in range(len(from_l)):
-                from_l[i] = tuple(from_l[i])
-            puzzle_list.append(MNPuzzle(tuple(from_l), self.to_grid))
-
-        return puzzle_list
+        # slide each tile next to "*", in the order right, left, bottom,
+        # top, into its place
+        for j in self._layout.neighbours[self._blank]:
+            yield self._slide(j)
+
+    def _slide(self, j):
+        """
+        Return the MNPuzzle that is self with the tile at position j,
+        next to "*", moved into the place of "*".
+
+        @type self: MNPuzzle
+        @type j: int
+        @rtype: MNPuzzle
+        """
+        layout = self._layout
+        tile = (self._state >> layout.shift[j]) & layout.mask
+        child = MNPuzzle.__new__(MNPuzzle)
+        child.n, child.m, child.to_grid = self.n, self.m, self.to_grid
+        child._layout, child._goal = layout, self._goal
+        child._state = (self._state ^ (tile << layout.shift[j]) ^
+                        (tile << layout.shift[self._blank]))
+        child._blank, child._unsolvable = j, self._unsolvable
+        return child
+
+    def moves(self):
+        """
+        Return the moves of MNPuzzle self, in the order of its extensions:
+        a move (j, b) slides the tile at position j into "*" at position b.
+
+        @type self: MNPuzzle
+        @rtype: tuple[(int, int)]
+
+        >>> p = MNPuzzle((("1", "*"), ("3", "2")), (("1", "2"), ("3", "*")))
+        >>> p.moves()
+        ((0, 1), (3, 1))
+        """
+        return self._layout.slides[self._blank]
+
+    def apply(self, move):
+        """
+        Slide the tile of move into "*" in MNPuzzle self, a copy.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+
+        >>> p = MNPuzzle((("1", "*"), ("3", "2")), (("1", "2"), ("3", "*")))
+        >>> q = p.copy()
+        >>> q.apply((3, 1))
+        >>> q.is_solved(), q.state_key() == p._goal
+        (True, True)
+        >>> q.undo((3, 1))
+        >>> q == p
+        True
+        """
+        j, b = move
+        layout = self._layout
+        tile = (self._state >> layout.shift[j]) & layout.mask
+        self._state ^= (tile << layout.shift[j]) ^ (tile << layout.shift[b])
+        self._blank = j
+
+    def undo(self, move):
+        """
+        Slide the tile of move back from where "*" was in MNPuzzle self.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+        """
+        j, b = move
+        layout = self._layout
+        tile = (self._state >> layout.shift[b]) & layout.mask
+        self._state ^= (tile << layout.shift[j]) ^ (tile << layout.shift[b])
+        self._blank = b
+
+    def inverse(self, move):
+        """
+        Return the move sliding the tile of move back.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: (int, int)
+        """
+        return move[1], move[0]
+
+    def copy(self):
+        """
+        Return a copy of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+        """
+        copy = MNPuzzle.__new__(MNPuzzle)
+        copy.__dict__.update(self.__dict__)
+        return copy
 
     # TODO
     # override is_solved
@@ -157,29 +258,298 @@ class MNPuzzle(Puzzle):
         >>> mn.is_solved()
         True
         """
-        return self.from_grid == self.to_grid
+        return self._state == self._goal
+
+
+    def fail_fast(self):
+        """
+        Return whether to_grid cannot be reached from MNPuzzle self: they
+        hold different tiles, or moving the tiles to their places in
+        to_grid takes a permutation of the wrong parity.
+
+        Every move swaps "*" with a tile, changing both the parity of the
+        permutation and that of the distance of "*" from its place in
+        to_grid, so the two always agree on reachable grids.  On boards
+        with more than one row and column every grid that agrees is
+        reachable; on a single line the tiles can only keep their order.
+        The check is made once, at the first call, and extensions reuse
+        the answer.
+
+        @type self: MNPuzzle
+        @rtype: bool
+
+        >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), goal).fail_fast()
+        False
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")), goal).fail_fast()
+        True
+        >>> MNPuzzle((("2", "*", "1"),), (("1", "2", "*"),)).fail_fast()
+        True
+        """
+        if self._unsolvable is None:
+            self._unsolvable = not _reachable(self._layout, self._state,
+                                              self._goal)
+        return self._unsolvable
+
+    def reverse(self):
+        """
+        Return the MNPuzzle from to_grid towards from_grid of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+
+        >>> p = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> p.reverse().from_grid
+        (('1', '2'), ('3', '*'))
+        """
+        return MNPuzzle(self.to_grid, self.from_grid)
+
+    def heuristic(self):
+        """
+        Return the Manhattan distance of MNPuzzle self's tiles from their
+        places in to_grid, plus two moves for each tile that must leave
+        its row or column to get around another tile in the same line
+        (linear conflict).  Never overestimates the moves needed.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), goal).heuristic()
+        3
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")), goal).heuristic()
+        4
+        """
+        goal = _goal_positions(self._layout, self._goal)
+        layout, state, distance = self._layout, self._state, 0
+        # goal columns of tiles already in their goal row, by row, and
+        # goal rows of tiles already in their goal column, by column
+        rows = [[] for _ in range(self.n)]
+        columns = [[] for _ in range(self.m)]
+        for r in range(self.n):
+            for c in range(self.m):
+                tile = (state >> layout.shift[r * self.m + c]) & layout.mask
+                if not tile or goal[tile] is None:
+                    continue
+                goal_r, goal_c = goal[tile]
+                distance += abs(goal_r - r) + abs(goal_c - c)
+                if goal_r == r:
+                    rows[r].append(goal_c)
+                if goal_c == c:
+                    columns[c].append(goal_r)
+        # tiles in a line that are not on its longest increasing run of
+        # goal positions each need at least two extra moves
+        for line in rows + columns:
+            if len(line) > 1:
+                distance += 2 * (len(line) - _longest_increasing(line))
+        return distance
+
+
+def _reachable(layout, state, goal):
+    """
+    Return whether the grid packed as goal can be reached from the one
+    packed as state by moves.  See MNPuzzle.fail_fast.
+
+    @type layout: _Layout
+    @type state: int
+    @type goal: int
+    @rtype: bool
+
+    >>> layout = _layout(2, 2, {"*", "1", "2", "3"})
+    >>> grid = lambda *rows: layout.pack(rows)
+    >>> _reachable(layout, grid("12", "3*"), grid("*2", "13"))
+    True
+    >>> _reachable(layout, grid("21", "3*"), grid("12", "3*"))
+    False
+    """
+    cells = [(state >> s) & layout.mask for s in layout.shift]
+    targets = [(goal >> s) & layout.mask for s in layout.shift]
+    if sorted(cells) != sorted(targets):
+        return False
+    if layout.n == 1 or layout.m == 1:
+        return ([v for v in cells if v] == [v for v in targets if v])
+    if len(set(cells)) < len(cells):
+        # swapping two equal tiles makes either parity reachable
+        return True
+    place = {v: i for i, v in enumerate(targets)}
+    # the parity of a permutation is that of its size less its cycles
+    seen, cycles = [False] * len(cells), 0
+    for i in range(len(cells)):
+        if not seen[i]:
+            cycles += 1
+            while not seen[i]:
+                seen[i] = True
+                i = place[cells[i]]
+    blank_r, blank_c = divmod(cells.index(0), layout.m)
+    goal_r, goal_c = divmod(targets.index(0), layout.m)
+    distance = abs(blank_r - goal_r) + abs(blank_c - goal_c)
+    return (len(cells) - cycles) % 2 == distance % 2
+
+
+class _Layout:
+    """
+    The fixed geometry shared by every MNPuzzle of one size and set of
+    symbols, and the packing of their grids into ints.
+
+    === Attributes ===
+    @type n: int
+        the number of rows
+    @type m: int
+        the number of columns
+    @type order: tuple[str]
+        "*" followed by the other symbols in sorted order, so order[v] is
+        the symbol packed as v
+    @type index: dict[str, int]
+        the inverse of order
+    @type bits: int
+        the bits each position takes, at least 4
+    @type mask: int
+        the mask of one position's bits
+    @type shift: list[int]
+        how far each position's bits are shifted, position r * m + c
+        being row r and column c
+    @type neighbours: list[tuple[int]]
+        the positions right of, left of, below and above each position,
+        in that order, where there are such positions
+    @type slides: list[tuple[(int, int)]]
+        the moves (j, b) from each position b of "*", one for each
+        position j in neighbours[b]
+    """
+
+    def __init__(self, n, m, symbols):
+        """
+        Create the _Layout self of n x m grids of symbols.
+
+        @type self: _Layout
+        @type n: int
+        @type m: int
+        @type symbols: set[str]
+        @rtype: None
+        """
+        self.n, self.m = n, m
+        self.order = ("*",) + tuple(sorted(symbols - {"*"}))
+        self.index = {d: v for v, d in enumerate(self.order)}
+        self.bits = max(4, (len(self.order) - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shift = [i * self.bits for i in range(n * m)]
+        self.neighbours = []
+        for i in range(n * m):
+            r, c = divmod(i, m)
+            self.neighbours.append(tuple(
+                [r * m + c + 1] * (c + 1 < m) + [r * m + c - 1] * (c > 0) +
+                [(r + 1) * m + c] * (r + 1 < n) + [(r - 1) * m + c] * (r > 0)))
+        self.slides = [tuple([(j, b) for j in self.neighbours[b]])
+                       for b in range(n * m)]
+
+    def pack(self, grid):
+        """
+        Return grid packed into an int.
+
+        @type self: _Layout
+        @type grid: tuple[tuple[str]]
+        @rtype: int
+        """
+        state, index = 0, self.index
+        for i, d in enumerate([d for r in grid for d in r]):
+            state |= index[d] << self.shift[i]
+        return state
+
+    def unpack(self, state):
+        """
+        Return the grid packed into int state.
+
+        @type self: _Layout
+        @type state: int
+        @rtype: tuple[tuple[str]]
+        """
+        cells = [self.order[(state >> s) & self.mask] for s in self.shift]
+        return tuple([tuple(cells[r * self.m:(r + 1) * self.m])
+                      for r in range(self.n)])
+
+
+def _layout(n, m, symbols):
+    """
+    Return the _Layout packing n x m grids of symbols.  MNPuzzle.__eq__
+    and the caches keyed on a layout compare layouts by identity, so
+    every grid of one shape and set of symbols must share one.
+
+    @type n: int
+    @type m: int
+    @type symbols: set[str]
+    @rtype: _Layout
+
+    >>> _layout(2, 2, {"*", "1", "2", "3"}).slides[3]
+    ((2, 3), (1, 3))
+    """
+    key = (n, m, frozenset(symbols))
+    if key not in _layouts:
+        _layouts[key] = _Layout(n, m, symbols)
+    return _layouts[key]
+
+
+# by rows, columns and frozen set of symbols
+_layouts = {}
+
+
+def _goal_positions(layout, goal):
+    """
+    Return a list with the (row, column) of each tile in the grid packed
+    as goal, indexed by the tile's packed value, and None for values not
+    in it.
+
+    @type layout: _Layout
+    @type goal: int
+    @rtype: list[(int, int) | None]
+    """
+    key = (id(layout), goal)
+    if key not in _goal_cache:
+        positions = [None] * len(layout.order)
+        for i in range(layout.n * layout.m):
+            positions[(goal >> layout.shift[i]) & layout.mask] = \
+                divmod(i, layout.m)
+        _goal_cache[key] = positions
+    return _goal_cache[key]
+
+
+# by id of the (never freed) _Layout and packed goal
+_goal_cache = {}
+
+
+def _longest_increasing(sequence):
+    """
+    Return the length of the longest strictly increasing subsequence of
+    sequence.
+
+    @type sequence: list[int]
+    @rtype: int
+
+    >>> _longest_increasing([2, 0, 1])
+    2
+    """
+    tails = []
+    for x in sequence:
+        i = bisect_left(tails, x)
+        if i == len(tails):
+            tails.append(x)
+        else:
+            tails[i] = x
+    return len(tails)
 
 
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
     target_grid = (("1", "2", "3"), ("4", "5", "*"))
-    start_grid = (("1", "2", "3"), ("5", "*", "5"))
-    #from puzzle_tools import breadth_first_solve, depth_first_solve
-    #from time import time
-    #start = time()
-    #solution = breadth_first_solve(MNPuzzle(start_grid, target_grid))
-    #end = time()
-    #print("BFS solved: \n\n{} \n\nin {} seconds".format(
-        #solution, end - start))
-    #start = time()
-    #solution = depth_first_solve((MNPuzzle(start_grid, target_grid)))
-    #end = time()
-    #print("DFS solved: \n\n{} \n\nin {} seconds".format(
-        #solution, end - start))
-
-
-    p = MNPuzzle(start_grid, target_grid)
-    print(str(p))
-    p2 = MNPuzzle(start_grid, target_grid)
-    [print(x) for x in p2.extensions()]
+    start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    from puzzle_tools import breadth_first_solve, depth_first_solve
+    from time import time
+    start = time()
+    solution = breadth_first_solve(MNPuzzle(start_grid, target_grid))
+    end = time()
+    print("BFS solved: \n\n{} \n\nin {} seconds".format(
+        solution, end - start))
+    start = time()
+    solution = depth_first_solve((MNPuzzle(start_grid, target_grid)))
+    end = time()
+    print("DFS solved: \n\n{} \n\nin {} seconds".format(
+        solution, end - start))
@@ -0,0 +1,281 @@
+"""
+Additive pattern databases: admissible MNPuzzle heuristics read from
+tables of exact move counts for groups of tiles.
+
+The tiles of to_grid are split into disjoint patterns.  For each pattern,
+a table holds, for every placement of its tiles, the fewest moves of
+those tiles (moves of other tiles are free) needed to bring them to their
+places in to_grid.  Since no move is counted in two tables, their sum
+never overestimates the moves needed.
+
+Tables are indexed by the positions p0, p1, ... of a pattern's tiles as
+p0 + p1 * cells + p2 * cells ** 2 + ..., one byte per entry, and saved to
+a file which load maps into memory, so that processes loading the same
+file share one copy of it.
+"""
+import json
+import mmap
+import os
+from collections import deque
+from mn_puzzle import MNPuzzle, _layout
+
+# starts every file written by PatternDatabase.save
+_MAGIC = b"MNPDB 1\n"
+
+
+class PatternDatabase:
+    """
+    Tables of the moves needed by disjoint patterns of tiles to reach
+    their places in one to_grid, which add up to a heuristic for
+    MNPuzzles working towards it.
+
+    A PatternDatabase is called on an MNPuzzle to get its estimate, so it
+    can be passed as the heuristic of astar_solve or ida_star_solve.
+
+    === Attributes ===
+    @type to_grid: tuple[tuple[str]]
+        the grid the tables lead to
+    @type patterns: list[tuple[str]]
+        the tiles of each table, in the order their positions index it
+    """
+
+    def __init__(self, to_grid, patterns, tables):
+        """
+        Create the PatternDatabase self of the tables, one per pattern in
+        patterns, of moves towards to_grid.
+
+        @type self: PatternDatabase
+        @type to_grid: tuple[tuple[str]]
+        @type patterns: list[tuple[str]]
+        @type tables: list[bytearray | memoryview]
+        @rtype: None
+        """
+        self.to_grid = tuple([tuple(r) for r in to_grid])
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self._tables = tables
+        # per (id of _Layout, packed goal): the packed value of each
+        # pattern's tiles, with the weight of each one's position
+        self._lookups = {}
+
+    def __call__(self, puzzle):
+        """
+        Return the sum over the tables of PatternDatabase self of the
+        moves needed by their tiles in MNPuzzle puzzle, which must work
+        towards self.to_grid.
+
+        @type self: PatternDatabase
+        @type puzzle: MNPuzzle
+        @rtype: int
+
+        >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+        >>> pdb = build(goal, [("1", "2", "3"), ("4", "5")])
+        >>> pdb(MNPuzzle((("*", "2", "3"), ("1", "4", "5")), goal))
+        3
+        >>> pdb(MNPuzzle((("5", "1", "3"), ("4", "*", "2")), goal))
+        15
+        >>> MNPuzzle((("5", "1", "3"), ("4", "*", "2")), goal).heuristic()
+        5
+        """
+        layout, state = puzzle._layout, puzzle._state
+        lookups = self._lookups.get((id(layout), puzzle._goal))
+        if lookups is None:
+            lookups = self._lookup(puzzle)
+        where = [0] * len(layout.order)
+        for i, s in enumerate(layout.shift):
+            where[(state >> s) & layout.mask] = i
+        total = 0
+        for table, tiles in zip(self._tables, lookups):
+            index = 0
+            for tile, weight in tiles:
+                index += where[tile] * weight
+            total += table[index]
+        return total
+
+    def _lookup(self, puzzle):
+        """
+        Return, for each table of PatternDatabase self, the packed value
+        of each of its tiles in MNPuzzle puzzle with the weight of the
+        tile's position in the table's index, remembering the answer for
+        puzzles of the same _Layout and goal.
+
+        @type self: PatternDatabase
+        @type puzzle: MNPuzzle
+        @rtype: list[list[(int, int)]]
+        """
+        layout = puzzle._layout
+        if tuple([tuple(r) for r in puzzle.to_grid]) != self.to_grid:
+            raise ValueError("pattern database built for another to_grid")
+        cells = layout.n * layout.m
+        lookups = [[(layout.index[tile], cells ** i)
+                    for i, tile in enumerate(pattern)]
+                   for pattern in self.patterns]
+        self._lookups[(id(layout), puzzle._goal)] = lookups
+        return lookups
+
+    def save(self, path):
+        """
+        Save PatternDatabase self to the file at path, for load.
+
+        @type self: PatternDatabase
+        @type path: str
+        @rtype: None
+        """
+        header = json.dumps({"to_grid": self.to_grid,
+                             "patterns": self.patterns,
+                             "sizes": [len(t) for t in self._tables]})
+        # write then rename, so a reader never sees half a file
+        with open(path + ".tmp", "wb") as f:
+            f.write(_MAGIC)
+            f.write(header.encode("utf-8") + b"\n")
+            for table in self._tables:
+                f.write(table)
+        os.replace(path + ".tmp", path)
+
+
+def build(to_grid, patterns):
+    """
+    Return the PatternDatabase of the tiles of to_grid split into
+    patterns, which must be disjoint groups of tiles, none of them "*",
+    each appearing once in to_grid.
+
+    Each table takes cells ** (len(pattern) + 1) bytes while it is built,
+    and cells ** len(pattern) afterwards, for the cells of to_grid.  In
+    pure Python, a table of five tiles on a 4x4 board takes about twenty
+    seconds; the 6-6-3 split of the 15-puzzle takes hours and about 270MB,
+    so it is built once, offline, with this module's main block, and then
+    loaded.
+
+    @type to_grid: tuple[tuple[str]]
+    @type patterns: list[tuple[str]]
+    @rtype: PatternDatabase
+
+    >>> goal = (("1", "2"), ("3", "*"))
+    >>> list(build(goal, [("1",), ("2", "3")])._tables[0])
+    [0, 1, 1, 2]
+    """
+    flat = [d for r in to_grid for d in r]
+    tiles = [tile for pattern in patterns for tile in pattern]
+    assert "*" not in tiles and len(set(tiles)) == len(tiles)
+    assert all([flat.count(tile) == 1 for tile in tiles])
+    layout = _layout(len(to_grid), len(to_grid[0]), set(flat))
+    tables = [_table(layout, [flat.index(tile) for tile in pattern],
+                     flat.index("*"))
+              for pattern in patterns]
+    return PatternDatabase(to_grid, patterns, tables)
+
+
+def _table(layout, places, blank):
+    """
+    Return the table of fewest moves of the tiles whose places are
+    places, with "*" at blank, for each placement of those tiles.
+
+    A breadth-first search backward from places keeps "*" in the state,
+    since where it is decides which tiles can move, but counts only the
+    moves of the pattern's tiles, so moving "*" through the other tiles
+    costs nothing.  Each entry is then the fewest moves over all places
+    of "*".
+
+    @type layout: _Layout
+    @type places: list[int]
+    @type blank: int
+    @rtype: bytearray
+    """
+    cells, neighbours = layout.n * layout.m, layout.neighbours
+    weights = [cells ** i for i in range(len(places))]
+    size = cells ** len(places)
+    # the moves found so far to each (placement, "*") as placement *
+    # cells + position of "*", or 255 if none were
+    moves = bytearray(b"\xff") * (size * cells)
+    start = sum([p * w for p, w in zip(places, weights)]) * cells + blank
+    moves[start] = 0
+    # states costing no more moves go on the left, so states leave the
+    # queue in order of moves
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        placement, at = divmod(state, cells)
+        found, rest = moves[state], placement
+        # which of the pattern's tiles is at each position it holds
+        tile_at = {}
+        for i in range(len(places)):
+            rest, position = divmod(rest, cells)
+            tile_at[position] = i
+        for j in neighbours[at]:
+            if j in tile_at:
+                # the pattern tile at j slides into "*" at at
+                moved = placement + (at - j) * weights[tile_at[j]]
+                child = moved * cells + j
+                if moves[child] > found + 1:
+                    moves[child] = found + 1
+                    queue.append(child)
+            elif moves[placement * cells + j] > found:
+                moves[placement * cells + j] = found
+                queue.appendleft(placement * cells + j)
+    table = moves[0::cells]
+    for at in range(1, cells):
+        table = bytearray(map(min, table, moves[at::cells]))
+    return table
+
+
+def load(path):
+    """
+    Return the PatternDatabase saved to the file at path, with its tables
+    read through a read-only memory map of the file.
+
+    @type path: str
+    @rtype: PatternDatabase
+
+    >>> import tempfile
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> pdb = build(goal, [("1", "2", "3"), ("4", "5")])
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     pdb.save(os.path.join(directory, "2x3.pdb"))
+    ...     loaded = load(os.path.join(directory, "2x3.pdb"))
+    ...     p = MNPuzzle((("5", "1", "3"), ("4", "*", "2")), goal)
+    ...     loaded(p), loaded.patterns
+    (15, [('1', '2', '3'), ('4', '5')])
+    """
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("{} is not a pattern database".format(path))
+        header = json.loads(f.readline().decode("utf-8"))
+        offset = f.tell()
+        # the map outlives the file object, and the tables' views keep it
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    tables = []
+    for size in header["sizes"]:
+        tables.append(data[offset:offset + size])
+        offset += size
+    return PatternDatabase(header["to_grid"], header["patterns"], tables)
+
+
+# the goal of the 15-puzzle, and its usual 6-6-3 split into patterns
+FIFTEEN = (("1", "2", "3", "4"), ("5", "6", "7", "8"),
+           ("9", "10", "11", "12"), ("13", "14", "15", "*"))
+FIFTEEN_663 = [("1", "5", "6", "9", "10", "13"),
+               ("7", "8", "11", "12", "14", "15"),
+               ("2", "3", "4")]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import sys
+    from time import time
+    from puzzle_tools import ida_star_solve
+    if len(sys.argv) > 1:
+        # python pattern_database.py fifteen.pdb builds the 6-6-3
+        # database of the 15-puzzle, which takes hours
+        start = time()
+        build(FIFTEEN, FIFTEEN_663).save(sys.argv[1])
+        print("built {} in {} seconds".format(sys.argv[1], time() - start))
+    goal = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+    hard = MNPuzzle((("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1")), goal)
+    start = time()
+    pdb = build(goal, [("1", "2", "4", "5"), ("3", "6", "7", "8")])
+    print("built 4-4 database of the 8-puzzle in {} seconds".format(
+        time() - start))
+    for name, heuristic in [("linear conflict", None), ("4-4 database", pdb)]:
+        start = time()
+        solution = ida_star_solve(hard, heuristic)
+        print("IDA* with {} solved in {} seconds".format(name, time() - start))
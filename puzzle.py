@@ -16,6 +16,93 @@ class Puzzle:
         """
         return False
 
+    def heuristic(self):
+        """
+        Return a lower bound on the number of extensions needed to get
+        from Puzzle self to a solution.
+
+        Informed solvers such as astar_solve use this estimate to order
+        their search; it must never overestimate for their solutions to
+        be shortest.  The default of 0 is always admissible; override
+        this in a subclass where a better bound is known.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return 0
+
+    def reverse(self):
+        """
+        Return a Puzzle starting from the solution of Puzzle self and
+        solved at self's current configuration.
+
+        Only puzzles whose solution is a single known configuration, and
+        whose every extension can be undone by another extension, can be
+        reversed; bidirectional_solve needs this.  Override this in such
+        a subclass.
+
+        @type self: Puzzle
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
+
+    def share(self):
+        """
+        Register any large read-only data Puzzle self refers to, so that
+        worker processes forked afterwards inherit it and pickled copies
+        of self refer to it instead of carrying it along, until unshare
+        is called as many times as share was.
+
+        Override this, and unshare, in a subclass that holds such data.
+
+        @type self: Puzzle
+        @rtype: None
+        """
+
+    def unshare(self):
+        """
+        Undo one call of share on Puzzle self.
+
+        @type self: Puzzle
+        @rtype: None
+        """
+
+    def state_key(self):
+        """
+        Return a hashable key identifying the configuration of Puzzle self.
+
+        Solvers use this key for their visited tables, so it should be
+        cheap to build and to hash.  Two puzzles of the same type with
+        equal keys are treated as the same state.  The default is the
+        string form of self; override this in a subclass with something
+        cheaper.  Keys of puzzles changed by apply must be equal to those
+        of the extensions they stand for.
+
+        @type self: Puzzle
+        @rtype: Hashable
+        """
+        return str(self)
+
+    def __eq__(self, other):
+        """
+        Return whether Puzzle self is in the same state as other.
+
+        @type self: Puzzle
+        @type other: Puzzle | Any
+        @rtype: bool
+        """
+        return (type(self) == type(other) and
+                self.state_key() == other.state_key())
+
+    def __hash__(self):
+        """
+        Return a hash of Puzzle self consistent with __eq__.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return hash(self.state_key())
+
     def is_solved(self):
         """
         Return True iff Puzzle self is solved.
@@ -33,9 +120,104 @@ class Puzzle:
         Return list of legal extensions of Puzzle self.
 
         This is an abstract method that must be implemented
-        in a subclass.
+        in a subclass, unless iter_extensions is.
+
+        @type self: Puzzle
+        @rtype: list[Puzzle]
+        """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the legal extensions of Puzzle self one at a time.
+
+        Solvers use this so that extensions they never reach are never
+        built.  The default builds the whole list from extensions;
+        override this in a subclass that can generate them lazily.
 
         @type self: Puzzle
         @rtype: generator[Puzzle]
         """
+        if type(self).extensions is Puzzle.extensions:
+            raise NotImplementedError
+        yield from self.extensions()
+
+    # moves, apply, undo, inverse, copy and freeze make up an optional
+    # protocol letting solvers search by changing one working puzzle in
+    # place, rather than building a new puzzle for every extension.  A
+    # subclass supporting it overrides all of them but inverse and
+    # freeze, which are optional.
+
+    def moves(self):
+        """
+        Return the moves that can be made from Puzzle self, in the order
+        of the extensions they lead to.
+
+        Override this in a subclass supporting the move protocol.
+
+        @type self: Puzzle
+        @rtype: Sequence[Hashable]
+        """
+        raise NotImplementedError
+
+    def apply(self, move):
+        """
+        Change Puzzle self, which must be a copy made by copy, into the
+        extension move leads to.  state_key, is_solved, fail_fast and
+        heuristic must then answer for the extension, and state_key
+        should be kept up to date by each move rather than rebuilt.
+
+        @type self: Puzzle
+        @type move: Hashable
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def undo(self, move):
+        """
+        Change Puzzle self back to what it was before apply(move), which
+        must be the last move applied to it and not yet undone.
+
+        @type self: Puzzle
+        @type move: Hashable
+        @rtype: None
+        """
         raise NotImplementedError
+
+    def inverse(self, move):
+        """
+        Return the move of Puzzle self leading back to the state before
+        move, the last move applied to self, or None if there is no such
+        move.  Solvers skip it rather than apply it and find its state
+        already seen.  The default of None is always safe.
+
+        @type self: Puzzle
+        @type move: Hashable
+        @rtype: Hashable | None
+        """
+        return None
+
+    def copy(self):
+        """
+        Return a Puzzle in the same state as Puzzle self, which apply and
+        undo can change without changing self.  Solvers also return such
+        copies, changed by one move each and then frozen, as the puzzles
+        of a solution.
+
+        Override this in a subclass supporting the move protocol.
+
+        @type self: Puzzle
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
+
+    def freeze(self):
+        """
+        Turn Puzzle self, a copy changed by apply, into a puzzle apply
+        and undo are no longer used on, dropping whatever it kept only
+        for them.  The default does nothing; override this in a subclass
+        whose copies keep such things.
+
+        @type self: Puzzle
+        @rtype: None
+        """
@@ -3,86 +3,1144 @@ Some functions for working with puzzles
 """
 from puzzle import Puzzle
 from collections import deque
+from array import array
+from heapq import heappush, heappop
+from itertools import count
+from operator import methodcaller
+from functools import partial, wraps
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, \
+    FIRST_COMPLETED
+from queue import Empty
+import multiprocessing
+import os
 from word_ladder_puzzle import * # Should we be importing indiviual puzzle classes?
 from sudoku_puzzle import *
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
-# you may uncomment the next lines on a unix system such as CDF
-# import resource
-# resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
-import sys
-sys.setrecursionlimit(10**6)
-
-
-# TODO
-# implement depth_first_solve
-# do NOT change the type contract
-# you are welcome to create any helper functions
-# you like
-def depth_first_solve(puzzle):
+
+
+def _measured(solver):
+    """
+    Return solver extended to add its running time to the wall_time of
+    the SearchStats passed as its stats keyword argument, if any.
+
+    @type solver: (...) -> PuzzleNode | None
+    @rtype: (...) -> PuzzleNode | None
+    """
+    @wraps(solver)
+    def measured(*args, stats=None, **kwargs):
+        if stats is None:
+            return solver(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return solver(*args, stats=stats, **kwargs)
+        finally:
+            stats.wall_time += perf_counter() - start
+    return measured
+
+
+def _probes(stats):
+    """
+    Return the is_solved, fail_fast, state_key and iter_extensions
+    functions a solver should call on its puzzles, timed and counted in
+    stats unless stats is None.
+
+    @type stats: SearchStats | None
+    @rtype: tuple[(Puzzle) -> Any]
+    """
+    if stats is None:
+        return _PLAIN_PROBES
+    return (stats._is_solved, stats._fail_fast, stats._state_key,
+            stats._iter_extensions)
+
+
+_PLAIN_PROBES = (methodcaller("is_solved"), methodcaller("fail_fast"),
+                 methodcaller("state_key"), methodcaller("iter_extensions"))
+
+
+def _has_moves(puzzle):
+    """
+    Return whether puzzle supports the move protocol of Puzzle.moves.
+
+    @type puzzle: Puzzle
+    @rtype: bool
+    """
+    return type(puzzle).moves is not Puzzle.moves
+
+
+def _move_probes(working, stats):
+    """
+    Return the is_solved, fail_fast, state_key, moves, apply and undo
+    methods of working, the copy a solver changes in place, timed and
+    counted in stats unless stats is None.  Moves, apply and undo are
+    timed as extensions, with each move applied counted as generated.
+
+    @type working: Puzzle
+    @type stats: SearchStats | None
+    @rtype: tuple[(...) -> Any]
+    """
+    if stats is None:
+        return (working.is_solved, working.fail_fast, working.state_key,
+                working.moves, working.apply, working.undo)
+    return (partial(stats._is_solved, working),
+            partial(stats._fail_fast, working),
+            partial(stats._state_key, working), stats._timed(working.moves),
+            stats._timed(working.apply, True), stats._timed(working.undo))
+
+
+@_measured
+def depth_first_solve(puzzle, workers=1, *, stats=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    If workers is more than 1, puzzle's search tree is split into
+    subtrees that are searched by that many processes, and the first
+    solution any of them finds is returned.  Otherwise a puzzle
+    supporting the move protocol of Puzzle.moves is searched by changing
+    one copy of it in place.  If stats is given, the search is measured
+    in it.
+
     @type puzzle: Puzzle
+    @type workers: int
+    @type stats: SearchStats | None
     @rtype: PuzzleNode | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cut"}
+    >>> sol = depth_first_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> while sol.children:
+    ...     sol = sol.children[0]
+    >>> sol.puzzle.is_solved()
+    True
+    >>> depth_first_solve(WordLadderPuzzle("cat", "pig", ws)) is None
+    True
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*", "*"] for r in range(4)]
+    >>> grid[1][0] = "."
+    >>> pegs = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> sol = depth_first_solve(pegs, workers=2)
+    >>> while sol.children:
+    ...     sol = sol.children[0]
+    >>> sol.puzzle.is_solved()
+    True
+    >>> grid[1][0], grid[0][0] = "*", "."
+    >>> pegs = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> depth_first_solve(pegs, workers=2) is None
+    True
+    """
+    is_solved, fail_fast, _, _ = _probes(stats)
+    if is_solved(puzzle):
+        return PuzzleNode(puzzle)
+    if fail_fast(puzzle):
+        return None
+    if workers > 1:
+        found = _parallel_depth_first(puzzle, workers, stats)
+    elif _has_moves(puzzle):
+        found = _depth_first_moves(puzzle, stats)
+        return None if found is None else _replay_moves(puzzle, found)
+    else:
+        found = _depth_first([puzzle], None, stats)
+    return None if found is None else _build_path(found)
+
+
+def _depth_first(path, check=None, stats=None, seen=None):
+    """
+    Return path extended by a path of puzzles from path[-1] to a
+    solution, searching depth-first, or None if there is none.
+
+    path[-1] must be neither solved nor failed.  If check is given it is
+    called with the current path and stack of extension iterators every
+    _CHECK_EVERY expansions, and the search is abandoned if it returns
+    False.  If seen is given, it holds the keys of states searched, or
+    being searched, elsewhere, which are not entered again, and the keys
+    of the states this search reaches are added to it.
+
+    @type path: list[Puzzle]
+    @type check: ((list[Puzzle], list[iterator[Puzzle]]) -> bool) | None
+    @type stats: SearchStats | None
+    @type seen: set[Hashable] | None
+    @rtype: list[Puzzle] | None
+    """
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    # one visited table for the whole search, so a state reached along
+    # one branch is never expanded again along another
+    if seen is None:
+        seen = set()
+    seen.add(state_key(path[-1]))
+    # stack[i] yields the extensions of path[len(path) - len(stack) + i]
+    stack, expansions = [extensions(path[-1])], 0
+    if stats is not None:
+        stats.expanding(len(path) - 1, 1, 1)
+    while stack:
+        for child in stack[-1]:
+            key = state_key(child)
+            if key in seen:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            seen.add(key)
+            if is_solved(child):
+                path.append(child)
+                return path
+            if not fail_fast(child):
+                # descend into child, leaving the rest of stack[-1]
+                # unexamined until child's subtree is exhausted
+                path.append(child)
+                stack.append(extensions(child))
+                expansions += 1
+                if stats is not None:
+                    stats.expanding(len(path) - 1, len(stack), len(seen))
+                if (check is not None and expansions % _CHECK_EVERY == 0
+                        and not check(path, stack)):
+                    return None
+                break
+        else:
+            # every extension of path[-1] has been tried
+            path.pop()
+            stack.pop()
+    return None
+
+
+def _depth_first_moves(puzzle, stats=None):
+    """
+    Return the moves of a path from puzzle to a solution, found in the
+    order _depth_first would find it, but by applying and undoing moves
+    on one copy of puzzle, or None if there is no path.
+
+    puzzle must be neither solved nor failed.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: list[Hashable] | None
+    """
+    working = puzzle.copy()
+    is_solved, fail_fast, state_key, moves, apply, undo = _move_probes(
+        working, stats)
+    seen = {state_key()}
+    # applied holds the moves from puzzle to working, stack[i] yields
+    # the moves left to try after the first i of them, and backs[i] is
+    # the one of those undoing the i-th, which is skipped
+    applied, stack, backs = [], [iter(moves())], [None]
+    if stats is not None:
+        stats.expanding(0, 1, 1)
+    while stack:
+        back = backs[-1]
+        for move in stack[-1]:
+            if move == back:
+                continue
+            apply(move)
+            key = state_key()
+            if key in seen:
+                if stats is not None:
+                    stats.duplicates += 1
+                undo(move)
+                continue
+            seen.add(key)
+            applied.append(move)
+            if is_solved():
+                return applied
+            if not fail_fast():
+                stack.append(iter(moves()))
+                backs.append(working.inverse(move))
+                if stats is not None:
+                    stats.expanding(len(applied), len(stack), len(seen))
+                break
+            undo(applied.pop())
+        else:
+            # every move after the moves applied has been tried
+            stack.pop()
+            backs.pop()
+            if applied:
+                undo(applied.pop())
+    return None
+
+
+def _replay_moves(puzzle, moves):
+    """
+    Return the root of a PuzzleNode path from puzzle through the states
+    moves lead to, each a copy of the one before changed by its move and
+    frozen.
+
+    @type puzzle: Puzzle
+    @type moves: list[Hashable]
+    @rtype: PuzzleNode
+    """
+    path = [puzzle]
+    for move in moves:
+        path.append(path[-1].copy())
+        path[-1].apply(move)
+        path[-1].freeze()
+    return _build_path(path)
+
+
+# how many expansions a worker makes between checks for cancellation
+# and for idle workers wanting a share of its stack
+_CHECK_EVERY = 256
+
+
+def _parallel_depth_first(puzzle, workers, stats=None):
+    """
+    Return a path of puzzles from puzzle to a solution found by workers
+    processes searching disjoint subtrees of puzzle, or None if there
+    is none.
+
+    Busy workers hand part of their stack to the pool whenever some
+    worker is idle, and all workers stop once a solution is found.  Each
+    worker keeps one visited table for all the subtrees it searches,
+    starting from the states expanded to split puzzle.  The counters
+    each worker collects are merged into stats.
+
+    Where processes can be forked, puzzle shares its large read-only
+    data with the workers, as in solve_many; elsewhere it is pickled
+    along with each subtree.
+
+    @type puzzle: Puzzle
+    @type workers: int
+    @type stats: SearchStats | None
+    @rtype: list[Puzzle] | None
+    """
+    tasks, found, seen = _split(puzzle, 4 * workers, stats)
+    if found is not None or not tasks:
+        return found
+    forking = "fork" in multiprocessing.get_all_start_methods()
+    if forking:
+        context = multiprocessing.get_context("fork")
+        puzzle.share()
+    else:
+        context = multiprocessing.get_context()
+    try:
+        return _run_search_pool(context, workers, tasks, seen, stats)
+    finally:
+        if forking:
+            puzzle.unshare()
+
+
+def _run_search_pool(context, workers, tasks, seen, stats=None):
     """
-    children = puzzle.extensions()
-    p = PuzzleNode(puzzle, children, None)  # Create the first puzzle node
-    initial = dfs_helper(p)  # Pass the root puzzle node to the helper function
-    if initial:
-        p1 = PuzzleNode(initial[-1].puzzle, [initial[-2]], p)
-        for i in range(2, len(initial)):
-            p2 = PuzzleNode(initial[-1 * (i)], [initial[ -1 * (i + 1)]],
-                            initial[-1 * (i - 1)])
-                # Iterate over the list and link the puzzle nodes together
-                # Return the root puzzle node linked through to the solution
-        return p
-    return None # Return None if no solution is possible
-
-def dfs_helper(puzzle_node):
-    """
-    A helper function to do the recursion for depth first solve.
-    @type puzzle: Puzzle
-    @rtype: list[PuzzleNode]
-    """
-    seen_set = set()
-
-    if puzzle_node.puzzle.is_solved():
-        return [puzzle_node]
-    child_list = []
-    temp_list = puzzle_node.puzzle.extensions()
-    # Create a list of puzzle extensions based on the current configuration
-    for node in temp_list:
-        if str(node) not in seen_set:
-            child_list.extend([PuzzleNode(node, node.extensions(), puzzle_node)])
-            seen_set.add(str(node))
-        # Convert the puzzle extensions into puzzle nodes and add them to a list
-    for item in child_list:
-        if dfs_helper(item):
-            return dfs_helper(item) + [item]
-    return False
-
-
-
-
-# TODO
-# implement breadth_first_solve
-# do NOT change the type contract
-# you are welcome to create any helper functions
-# you like
-# Hint: you may find a queue useful, that's why
-# we imported deque
-def breadth_first_solve(puzzle):
+    Return a path of puzzles to a solution found by a pool of workers
+    processes started in context searching tasks, paths to the roots of
+    subtrees, with visited tables starting from seen, or None if there
+    is none.
+
+    @type context: multiprocessing.context.BaseContext
+    @type workers: int
+    @type tasks: list[list[Puzzle]]
+    @type seen: set[Hashable]
+    @type stats: SearchStats | None
+    @rtype: list[Puzzle] | None
+    """
+    stop, idle = context.Event(), context.Value("i", 0)
+    donations = context.Queue()
+    pool = ProcessPoolExecutor(workers, mp_context=context,
+                               initializer=_init_search_worker,
+                               initargs=(stop, idle, donations, seen))
+    measure = stats is not None
+    pending = {pool.submit(_search_subtree, task, measure)
+               for task in tasks}
+    # donated counts tasks finished workers report putting on donations,
+    # and received those taken off it, so once nothing is pending the
+    # rest of the donations are waited for
+    donated = received = 0
+    try:
+        while pending or received < donated:
+            while True:
+                try:
+                    task = donations.get(block=not pending and
+                                         received < donated)
+                except Empty:
+                    break
+                received += 1
+                pending.add(pool.submit(_search_subtree, task, measure))
+            idle.value = max(0, workers - len(pending))
+            done, pending = wait(pending, timeout=0.05,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                found, gave, worker_stats = future.result()
+                donated += gave
+                if measure:
+                    stats.merge(worker_stats)
+                if found is not None:
+                    return found
+        return None
+    finally:
+        stop.set()
+        pool.shutdown(cancel_futures=True)
+
+
+def _split(puzzle, target, stats=None):
+    """
+    Return (tasks, None, seen) where tasks are paths from puzzle to the
+    roots of at least target disjoint subtrees, found by expanding
+    puzzle breadth-first a level at a time, or fewer if the search space
+    runs out, and seen holds the keys of the states reached doing so.
+    Return ([], path, seen) if a path to a solution turns up first.
+
+    @type puzzle: Puzzle
+    @type target: int
+    @type stats: SearchStats | None
+    @rtype: (list[list[Puzzle]], list[Puzzle] | None, set[Hashable])
+    """
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    seen, layer = {state_key(puzzle)}, [[puzzle]]
+    while layer and len(layer) < target:
+        next_layer = []
+        for path in layer:
+            if stats is not None:
+                stats.expanding(len(path) - 1, len(layer) + len(next_layer),
+                                len(seen))
+            for child in extensions(path[-1]):
+                key = state_key(child)
+                if key in seen:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                seen.add(key)
+                if is_solved(child):
+                    return [], path + [child], seen
+                if not fail_fast(child):
+                    next_layer.append(path + [child])
+        layer = next_layer
+    return layer, None, seen
+
+
+def _init_search_worker(stop, idle, donations, seen):
+    """
+    Keep the channels shared with the parent process of a search worker,
+    and start its visited table from seen.
+
+    @type stop: multiprocessing.Event
+    @type idle: multiprocessing.Value
+    @type donations: multiprocessing.Queue
+    @type seen: set[Hashable]
+    @rtype: None
+    """
+    global _worker_channels, _worker_seen
+    _worker_channels = (stop, idle, donations)
+    _worker_seen = set(seen)
+    # donations left unread after a solution is found must not keep
+    # this process from exiting
+    donations.cancel_join_thread()
+
+
+_worker_channels = None
+
+# the keys of the states a search worker has reached, in any subtree
+_worker_seen = None
+
+
+def _search_subtree(task, measure):
+    """
+    Return (path, gave, stats) where path extends task to a solution, or
+    is None if there is none or the search was stopped, gave is the
+    number of subtrees given away to idle workers on the way, and stats
+    measures the search if measure is True, and is None otherwise.
+
+    @type task: list[Puzzle]
+    @type measure: bool
+    @rtype: (list[Puzzle] | None, int, SearchStats | None)
+    """
+    stop, idle, donations = _worker_channels
+    seen = _worker_seen
+    stats = SearchStats() if measure else None
+    is_solved, fail_fast, state_key, _ = _probes(stats)
+    gave = 0
+
+    def check(path, stack):
+        # give away half of the untried extensions at the shallowest
+        # level that has any, since those subtrees are the largest
+        nonlocal gave
+        if stop.is_set():
+            return False
+        if idle.value > 0:
+            with idle.get_lock():
+                if idle.value <= 0:
+                    return True
+                idle.value -= 1
+            base = len(path) - len(stack)
+            for i in range(len(stack)):
+                rest = list(stack[i])
+                keep = (len(rest) + 1) // 2
+                stack[i] = iter(rest[:keep])
+                given = 0
+                for child in rest[keep:]:
+                    # a donated subtree is searched elsewhere, so it is
+                    # seen here, and one already seen is not donated
+                    key = state_key(child)
+                    if key not in seen:
+                        seen.add(key)
+                        donations.put(path[:base + i + 1] + [child])
+                        given += 1
+                if given:
+                    gave += given
+                    break
+        return True
+
+    root = task[-1]
+    if is_solved(root):
+        return task, 0, stats
+    if fail_fast(root):
+        return None, 0, stats
+    # the states on the way to root are being searched already
+    seen.update([state_key(p) for p in task[:-1]])
+    return _depth_first(list(task), check, stats, seen), gave, stats
+
+
+def solve_many(puzzles, strategy=depth_first_solve, workers=None,
+               chunksize=None):
+    """
+    Yield (i, solution) for each puzzles[i] as soon as strategy has
+    solved it, with the puzzles split into chunks solved by a pool of
+    workers processes (one per core by default).
+
+    Where processes can be forked, each puzzle shares its large
+    read-only data while the pool runs, so the workers inherit it rather
+    than receive a pickled copy with each puzzle or solution.
+
+    @type puzzles: list[Puzzle]
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type workers: int | None
+    @type chunksize: int | None
+    @rtype: generator[(int, PuzzleNode | None)]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog"}
+    >>> ladders = [WordLadderPuzzle("cat", w, ws) for w in ["dog", "pig"]]
+    >>> sorted([(i, sol is None) for i, sol in solve_many(ladders, workers=2)])
+    [(0, False), (1, True)]
+    """
+    puzzles = list(puzzles)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(puzzles) // (4 * workers))
+    forking = "fork" in multiprocessing.get_all_start_methods()
+    if forking:
+        context = multiprocessing.get_context("fork")
+        for puzzle in puzzles:
+            puzzle.share()
+    else:
+        context = multiprocessing.get_context()
+    # the puzzles reach the workers through the initializer, which forked
+    # processes inherit without pickling, so tasks are just index ranges
+    try:
+        with ProcessPoolExecutor(workers, mp_context=context,
+                                 initializer=_init_batch_worker,
+                                 initargs=(puzzles, strategy)) as pool:
+            futures = [pool.submit(_solve_chunk, start,
+                                   min(start + chunksize, len(puzzles)))
+                       for start in range(0, len(puzzles), chunksize)]
+            for future in as_completed(futures):
+                for i, path in future.result():
+                    yield i, None if path is None else _build_path(path)
+    finally:
+        if forking:
+            for puzzle in puzzles:
+                puzzle.unshare()
+
+
+def _init_batch_worker(puzzles, strategy):
+    """
+    Keep the puzzles and strategy of a solve_many worker process.
+
+    @type puzzles: list[Puzzle]
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @rtype: None
+    """
+    global _batch
+    _batch = (puzzles, strategy)
+
+
+_batch = None
+
+
+def _solve_chunk(start, stop):
+    """
+    Return (i, path) for each i in range(start, stop), where path lists
+    the puzzles on the solution strategy finds for the i-th batch
+    puzzle, or is None.  Paths are returned flat rather than as
+    PuzzleNodes, which would pickle recursively.
+
+    @type start: int
+    @type stop: int
+    @rtype: list[(int, list[Puzzle] | None)]
+    """
+    puzzles, strategy = _batch
+    results = []
+    for i in range(start, stop):
+        node, path = strategy(puzzles[i]), None
+        if node is not None:
+            path = [node.puzzle]
+            while node.children:
+                node = node.children[0]
+                path.append(node.puzzle)
+        results.append((i, path))
+    return results
+
+
+def _build_path(puzzles):
+    """
+    Return the root of a chain of PuzzleNodes holding puzzles in order,
+    each node having the next one as its only child.
+
+    @type puzzles: list[Puzzle]
+    @rtype: PuzzleNode
+    """
+    root = node = PuzzleNode(puzzles[0])
+    for puzzle in puzzles[1:]:
+        child = PuzzleNode(puzzle, None, node)
+        node.children.append(child)
+        node = child
+    return root
+
+
+
+
+@_measured
+def breadth_first_solve(puzzle, *, stats=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
+    If stats is given, the search is measured in it.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cut", "dut", "dug"}
+    >>> sol = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> length = 0
+    >>> while sol.children:
+    ...     sol, length = sol.children[0], length + 1
+    >>> sol.puzzle.is_solved(), length
+    (True, 3)
+    """
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    if is_solved(puzzle):
+        return PuzzleNode(puzzle)
+    if fail_fast(puzzle):
+        return None
+    # every generated state is recorded once in these flat tables:
+    # keys[i] is its state key, parents[i] the index of the state it
+    # was generated from, and index maps a key back to i
+    root_key = state_key(puzzle)
+    keys, parents, index = [root_key], array("l", [-1]), {root_key: 0}
+    # only the frontier holds puzzle objects; they are dropped once
+    # expanded
+    frontier = deque([(0, puzzle)])
+    # states are expanded in order of index, so the depth goes up each
+    # time the first index past the previous layer is reached
+    depth, next_layer = 0, 1
+    while frontier:
+        i, current = frontier.popleft()
+        if i >= next_layer:
+            depth, next_layer = depth + 1, len(keys)
+        if stats is not None:
+            stats.expanding(depth, len(frontier) + 1, len(keys))
+        for child in extensions(current):
+            key = state_key(child)
+            if key in index:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            index[key] = len(keys)
+            keys.append(key)
+            parents.append(i)
+            if is_solved(child):
+                return _replay_path(puzzle, _key_chain(keys, parents))
+            if not fail_fast(child):
+                frontier.append((index[key], child))
+    return None
+
+
+def _key_chain(keys, parents):
+    """
+    Return the keys on the path from the root to the last recorded
+    state, following parent indices back from the end of keys.
+
+    @type keys: list[Hashable]
+    @type parents: array[int]
+    @rtype: list[Hashable]
+    """
+    chain, i = [], len(keys) - 1
+    while i >= 0:
+        chain.append(keys[i])
+        i = parents[i]
+    chain.reverse()
+    return chain
+
+
+def _replay_path(puzzle, chain):
+    """
+    Return the root of a PuzzleNode path from puzzle through the states
+    whose keys are listed in chain.
+
+    Only the puzzles along the path are rebuilt: at each step the
+    extension of the previous puzzle with the next key in chain is
+    chosen.
 
     @type puzzle: Puzzle
+    @type chain: list[Hashable]
     @rtype: PuzzleNode
     """
+    path = [puzzle]
+    for key in chain[1:]:
+        path.append(next(child for child in path[-1].iter_extensions()
+                         if child.state_key() == key))
+    return _build_path(path)
+
+
+def all_shortest_solutions(puzzle, *, stats=None):
+    """
+    Yield every shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, each as depth_first_solve would return it.
+
+    One breadth-first search runs to the end of the first layer holding
+    a solution, keeping for each state only the states of the layer
+    before that reach it.  The paths through those edges are then
+    yielded one at a time, so only the path being yielded is rebuilt as
+    puzzles.  If stats is given, the search is measured in it, with the
+    time the caller spends between solutions left out of its wall_time.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: generator[PuzzleNode]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "dot", "cut", "dut", "dug"}
+    >>> ladders = []
+    >>> for sol in all_shortest_solutions(WordLadderPuzzle("cat", "dog", ws)):
+    ...     words = [sol.puzzle.state_key()]
+    ...     while sol.children:
+    ...         sol = sol.children[0]
+    ...         words.append(sol.puzzle.state_key())
+    ...     ladders.append(words)
+    >>> sorted(ladders)
+    [['cat', 'cot', 'cog', 'dog'], ['cat', 'cot', 'dot', 'dog']]
+    >>> list(all_shortest_solutions(WordLadderPuzzle("cat", "pig", ws)))
+    []
+    >>> stats = SearchStats()
+    >>> len(list(all_shortest_solutions(WordLadderPuzzle("cat", "dog", ws),
+    ...                                 stats=stats)))
+    2
+    >>> stats.wall_time > 0
+    True
+    """
+    if stats is None:
+        yield from _shortest_solutions(puzzle)
+        return
+    solutions, start = _shortest_solutions(puzzle, stats), perf_counter()
+    try:
+        for solution in solutions:
+            stats.wall_time += perf_counter() - start
+            # the caller's time until it asks for the next one is not
+            # the solver's
+            start = None
+            yield solution
+            start = perf_counter()
+    finally:
+        if start is not None:
+            stats.wall_time += perf_counter() - start
+
+
+def _shortest_solutions(puzzle, stats=None):
+    """
+    Yield what all_shortest_solutions does, without adding to the
+    wall_time of stats.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: generator[PuzzleNode]
+    """
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    if is_solved(puzzle):
+        yield PuzzleNode(puzzle)
+        return
+    if fail_fast(puzzle):
+        return
+    root_key = state_key(puzzle)
+    # parents[key] lists the keys of the layer before key's that reach it
+    parents, goals = {root_key: []}, []
+    layer, depth = [puzzle], 0
+    while layer and not goals:
+        next_layer, reached = [], {}
+        for current in layer:
+            key = state_key(current)
+            if stats is not None:
+                stats.expanding(depth, len(layer) + len(next_layer),
+                                len(parents) + len(reached))
+            for child in extensions(current):
+                child_key = state_key(child)
+                if child_key in reached:
+                    reached[child_key].append(key)
+                    continue
+                if child_key in parents:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                reached[child_key] = [key]
+                if is_solved(child):
+                    goals.append(child_key)
+                elif not fail_fast(child):
+                    next_layer.append(child)
+        parents.update(reached)
+        layer, depth = next_layer, depth + 1
+    # walk back from each goal to the root through every parent, with
+    # iters[i] running over the parents of chain[i]
+    for goal in goals:
+        chain, iters = [goal], [iter(parents[goal])]
+        while iters:
+            parent = next(iters[-1], None)
+            if parent is None:
+                chain.pop()
+                iters.pop()
+            elif parent == root_key:
+                yield _replay_path(puzzle, [root_key] + chain[::-1])
+            else:
+                chain.append(parent)
+                iters.append(iter(parents[parent]))
+
+
+@_measured
+def bidirectional_solve(puzzle, *, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, found by breadth-first searches growing from
+    both puzzle and its solution until they meet.  Return None if this
+    is not possible.
+
+    puzzle must support Puzzle.reverse.  Each round expands the whole
+    current layer of whichever side has the smaller one.  If stats is
+    given, the search is measured in it.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cut", "dut", "dug"}
+    >>> sol = bidirectional_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> words = [sol.puzzle.state_key()]
+    >>> while sol.children:
+    ...     sol = sol.children[0]
+    ...     words.append(sol.puzzle.state_key())
+    >>> words
+    ['cat', 'cot', 'cog', 'dog']
+    >>> bidirectional_solve(WordLadderPuzzle("cat", "pig", ws)) is None
+    True
+    """
+    is_solved, fail_fast, state_key, _ = _probes(stats)
+    if is_solved(puzzle):
+        return PuzzleNode(puzzle)
+    if fail_fast(puzzle):
+        return None
+    goal = puzzle.reverse()
+    # each side maps the keys it has reached to (parent key, depth)
+    forward = {state_key(puzzle): (None, 0)}
+    backward = {state_key(goal): (None, 0)}
+    forward_layer, backward_layer = [puzzle], [goal]
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meet = _expand_layer(forward_layer, forward,
+                                                backward, stats)
+        else:
+            backward_layer, meet = _expand_layer(backward_layer, backward,
+                                                 forward, stats)
+        if meet is not None:
+            chain = _parent_chain(forward, meet)
+            chain.reverse()
+            chain.extend(_parent_chain(backward, meet)[1:])
+            return _replay_path(puzzle, chain)
+    return None
+
+
+def _expand_layer(layer, own, other, stats=None):
+    """
+    Return the next layer of a breadth-first search from layer, recording
+    new states in own, along with the key where it met the other
+    search's states in other closest to the other search's root, or None.
+
+    @type layer: list[Puzzle]
+    @type own: dict[Hashable, (Hashable | None, int)]
+    @type other: dict[Hashable, (Hashable | None, int)]
+    @type stats: SearchStats | None
+    @rtype: (list[Puzzle], Hashable | None)
+    """
+    _, fail_fast, state_key, extensions = _probes(stats)
+    next_layer, meet = [], None
+    for current in layer:
+        key = state_key(current)
+        depth = own[key][1] + 1
+        if stats is not None:
+            stats.expanding(depth - 1, len(layer) + len(next_layer),
+                            len(own) + len(other))
+        for child in extensions(current):
+            child_key = state_key(child)
+            if child_key in own:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            own[child_key] = (key, depth)
+            if child_key in other:
+                if meet is None or other[child_key][1] < other[meet][1]:
+                    meet = child_key
+            elif not fail_fast(child):
+                next_layer.append(child)
+    return next_layer, meet
+
+
+def _parent_chain(parents, key):
+    """
+    Return the keys from key back to the root of a search, following the
+    parent keys recorded in parents.
+
+    @type parents: dict[Hashable, (Hashable | None, int)]
+    @type key: Hashable
+    @rtype: list[Hashable]
+    """
+    chain = []
+    while key is not None:
+        chain.append(key)
+        key = parents[key][0]
+    return chain
+
+
+@_measured
+def astar_solve(puzzle, heuristic=None, *, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, searching states in order of moves made plus
+    heuristic(state).  Return None if this is not possible.
+
+    heuristic defaults to each puzzle's own heuristic method, and must
+    never overestimate for the path to be shortest.  If stats is given,
+    the search is measured in it.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start = (("*", "2", "3"), ("1", "4", "5"))
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = astar_solve(MNPuzzle(start, goal))
+    >>> length = 0
+    >>> while sol.children:
+    ...     sol, length = sol.children[0], length + 1
+    >>> sol.puzzle.is_solved(), length
+    (True, 3)
+    """
+    if heuristic is None:
+        heuristic = _own_heuristic
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    if fail_fast(puzzle):
+        return None
+    root_key = state_key(puzzle)
+    # best[key] is (key of its parent, fewest moves found to key)
+    best = {root_key: (None, 0)}
+    # open list entries are (f, -g, tie, key, puzzle): ties on f go to
+    # the deeper state, and then to the earliest pushed
+    tie = count()
+    open_list = [(heuristic(puzzle), 0, next(tie), root_key, puzzle)]
+    while open_list:
+        _, g, _, key, current = heappop(open_list)
+        g = -g
+        if best[key][1] < g:
+            # stale entry: key was pushed again with fewer moves, so
+            # this one is skipped rather than removed from the heap
+            continue
+        if is_solved(current):
+            chain = _parent_chain(best, key)
+            chain.reverse()
+            return _replay_path(puzzle, chain)
+        if stats is not None:
+            stats.expanding(g, len(open_list) + 1, len(best))
+        for child in extensions(current):
+            child_key, child_g = state_key(child), g + 1
+            if child_key in best and best[child_key][1] <= child_g:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            if fail_fast(child):
+                continue
+            best[child_key] = (key, child_g)
+            heappush(open_list, (child_g + heuristic(child), -child_g,
+                                 next(tie), child_key, child))
+    return None
+
+
+@_measured
+def ida_star_solve(puzzle, heuristic=None, *, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, using depth-first searches bounded by moves
+    made plus heuristic(state), with the bound raised after each
+    unsuccessful search.  Return None if this is not possible.
+
+    Only the current path is kept in memory, and for a puzzle supporting
+    the move protocol of Puzzle.moves only one copy of it, changed in
+    place.  heuristic defaults to each puzzle's own heuristic method, and
+    must never overestimate for the path to be shortest.  If stats is
+    given, the search is measured in it, totalled over all the bounded
+    searches.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start = (("*", "2", "3"), ("1", "4", "5"))
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = ida_star_solve(MNPuzzle(start, goal))
+    >>> length = 0
+    >>> while sol.children:
+    ...     sol, length = sol.children[0], length + 1
+    >>> sol.puzzle.is_solved(), length
+    (True, 3)
+    """
+    if heuristic is None:
+        heuristic = _own_heuristic
+    is_solved, fail_fast, _, _ = _probes(stats)
+    if is_solved(puzzle):
+        return PuzzleNode(puzzle)
+    if fail_fast(puzzle):
+        return None
+    bound = heuristic(puzzle)
+    while bound is not None:
+        if _has_moves(puzzle):
+            found, bound = _bounded_moves(puzzle, heuristic, bound, stats)
+            if found is not None:
+                return _replay_moves(puzzle, found)
+        else:
+            path, bound = _bounded_search(puzzle, heuristic, bound, stats)
+            if path is not None:
+                return _build_path(path)
+    return None
+
+
+def _bounded_search(puzzle, heuristic, bound, stats=None):
+    """
+    Return (path, None) for a path of puzzles from puzzle to a solution
+    whose moves plus heuristic never exceed bound, or (None, next_bound)
+    where next_bound is the smallest value that did exceed bound, or
+    None if nothing did.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int
+    @type bound: int
+    @type stats: SearchStats | None
+    @rtype: (list[Puzzle] | None, int | None)
+    """
+    is_solved, fail_fast, state_key, extensions = _probes(stats)
+    next_bound = None
+    path, stack = [puzzle], [extensions(puzzle)]
+    on_path = {state_key(puzzle)}
+    if stats is not None:
+        stats.expanding(0, 1, 1)
+    while stack:
+        for child in stack[-1]:
+            key = state_key(child)
+            if key in on_path:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            if fail_fast(child):
+                continue
+            f = len(path) + heuristic(child)
+            if f > bound:
+                if next_bound is None or f < next_bound:
+                    next_bound = f
+                continue
+            if is_solved(child):
+                path.append(child)
+                return path, None
+            path.append(child)
+            stack.append(extensions(child))
+            on_path.add(key)
+            if stats is not None:
+                stats.expanding(len(path) - 1, len(stack), len(on_path))
+            break
+        else:
+            on_path.discard(state_key(path.pop()))
+            stack.pop()
+    return None, next_bound
+
+
+def _bounded_moves(puzzle, heuristic, bound, stats=None):
+    """
+    Return what _bounded_search does, but with the moves of the path in
+    place of its puzzles, found by applying and undoing moves on one
+    copy of puzzle.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int
+    @type bound: int
+    @type stats: SearchStats | None
+    @rtype: (list[Hashable] | None, int | None)
+    """
+    working = puzzle.copy()
+    is_solved, fail_fast, state_key, moves, apply, undo = _move_probes(
+        working, stats)
+    next_bound = None
+    # as in _depth_first_moves, with keys[i] the key of the state after
+    # the first i moves applied
+    keys = [state_key()]
+    on_path = {keys[0]}
+    applied, stack, backs = [], [iter(moves())], [None]
+    if stats is not None:
+        stats.expanding(0, 1, 1)
+    while stack:
+        back = backs[-1]
+        for move in stack[-1]:
+            if move == back:
+                continue
+            apply(move)
+            key = state_key()
+            if key in on_path:
+                if stats is not None:
+                    stats.duplicates += 1
+                undo(move)
+                continue
+            if fail_fast():
+                undo(move)
+                continue
+            f = len(keys) + heuristic(working)
+            if f > bound:
+                if next_bound is None or f < next_bound:
+                    next_bound = f
+                undo(move)
+                continue
+            applied.append(move)
+            if is_solved():
+                return applied, None
+            keys.append(key)
+            on_path.add(key)
+            stack.append(iter(moves()))
+            backs.append(working.inverse(move))
+            if stats is not None:
+                stats.expanding(len(applied), len(stack), len(on_path))
+            break
+        else:
+            stack.pop()
+            backs.pop()
+            if applied:
+                on_path.discard(keys.pop())
+                undo(applied.pop())
+    return None, next_bound
+
+
+def _own_heuristic(puzzle):
+    """
+    Return puzzle's own estimate of its distance to a solution.
+
+    @type puzzle: Puzzle
+    @rtype: int
+    """
+    return puzzle.heuristic()
 
 
 # Class PuzzleNode helps build trees of PuzzleNodes that have
@@ -135,18 +1193,240 @@ class PuzzleNode:
         """
         Return a human-readable string representing PuzzleNode self.
 
-        # doctest not feasible.
+        Nodes are visited with an explicit stack rather than recursion,
+        so that paths of any length can be printed.
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"on", "oo", "no"}
+        >>> leaf = PuzzleNode(WordLadderPuzzle("no", "no", ws))
+        >>> root = PuzzleNode(WordLadderPuzzle("on", "no", ws), [leaf])
+        >>> print(root)
+        From word: on, To word: no
+        <BLANKLINE>
+        From word: no, To word: no
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        parts, stack = [], [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+                continue
+            parts.append("{}\n\n".format(node.puzzle))
+            # children come off the stack in order, separated by newlines
+            for i in range(len(node.children) - 1, -1, -1):
+                stack.append(node.children[i])
+                if i > 0:
+                    stack.append("\n")
+        return "".join(parts)
+
+
+
+class SearchStats:
+    """
+    Counters and timings describing one or more searches.
+
+    Pass a SearchStats as the stats keyword argument of a solver in
+    puzzle_tools to have it filled in.  If callback is given, it is called
+    with the SearchStats after every report_every expansions.
+
+    === Attributes ===
+    @type generated: int
+        extensions produced by iter_extensions, or moves applied
+    @type expanded: int
+        puzzles whose extensions were asked for
+    @type duplicates: int
+        extensions dropped because their state was already seen
+    @type pruned: int
+        puzzles for which fail_fast returned True
+    @type peak_frontier: int
+        most puzzles waiting to be expanded (or stack depth, for
+        depth-first searches) at once
+    @type peak_visited: int
+        most state keys held in the visited table at once
+    @type max_depth: int
+        depth of the deepest puzzle expanded
+    @type wall_time: float
+        seconds spent in solvers
+    @type extensions_time: float
+        seconds spent in iter_extensions, or in moves, apply and undo
+    @type is_solved_time: float
+        seconds spent in is_solved
+    @type fail_fast_time: float
+        seconds spent in fail_fast
+    @type state_key_time: float
+        seconds spent building state keys for hashing
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cut", "dut", "dug"}
+    >>> stats = SearchStats()
+    >>> sol = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws),
+    ...                           stats=stats)
+    >>> stats.expanded, stats.max_depth, stats.peak_visited
+    (4, 2, 5)
+    >>> stats.wall_time > 0
+    True
+    >>> try:
+    ...     breadth_first_solve(WordLadderPuzzle("cat", "dog", ws), stats)
+    ... except TypeError:
+    ...     print("stats must be passed by keyword")
+    stats must be passed by keyword
+    """
+
+    def __init__(self, report_every=1000, callback=None):
+        """
+        Create a new SearchStats self with all counters at zero.
+
+        @type self: SearchStats
+        @type report_every: int
+        @type callback: ((SearchStats) -> Any) | None
+        @rtype: None
+        """
+        self.generated = self.expanded = self.duplicates = self.pruned = 0
+        self.peak_frontier = self.peak_visited = self.max_depth = 0
+        self.wall_time = self.extensions_time = 0.0
+        self.is_solved_time = self.fail_fast_time = 0.0
+        self.state_key_time = 0.0
+        self.report_every, self.callback = report_every, callback
+
+    def expanding(self, depth, frontier, visited):
+        """
+        Record that a puzzle at depth is being expanded, with frontier
+        puzzles waiting and visited state keys seen.
+
+        @type self: SearchStats
+        @type depth: int
+        @type frontier: int
+        @type visited: int
+        @rtype: None
+        """
+        self.expanded += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if visited > self.peak_visited:
+            self.peak_visited = visited
+        if (self.callback is not None and
+                self.expanded % self.report_every == 0):
+            self.callback(self)
+
+    def merge(self, other):
+        """
+        Add the counters and timings of SearchStats other into self,
+        taking the larger of each peak.
+
+        @type self: SearchStats
+        @type other: SearchStats
+        @rtype: None
+        """
+        for name in ["generated", "expanded", "duplicates", "pruned",
+                     "extensions_time", "is_solved_time", "fail_fast_time",
+                     "state_key_time"]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in ["peak_frontier", "peak_visited", "max_depth"]:
+            setattr(self, name, max(getattr(self, name),
+                                    getattr(other, name)))
+
+    def expansion_rate(self):
+        """
+        Return puzzles expanded per second of wall time.
+
+        @type self: SearchStats
+        @rtype: float
+        """
+        return self.expanded / self.wall_time if self.wall_time else 0.0
+
+    def as_dict(self):
         """
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        Return the counters and timings of SearchStats self by name.
+
+        @type self: SearchStats
+        @rtype: dict[str, int | float]
+        """
+        return {name: value for name, value in vars(self).items()
+                if name not in ("report_every", "callback")}
+
+    def __getstate__(self):
+        """
+        Return the state of SearchStats self to pickle, leaving out its
+        callback.
+
+        @type self: SearchStats
+        @rtype: dict
+        """
+        state = dict(vars(self))
+        state["callback"] = None
+        return state
+
+    def __str__(self):
+        """
+        Return a human-readable summary of SearchStats self.
+
+        @type self: SearchStats
+        @rtype: str
+        """
+        return ("{} expanded ({:.0f}/s), {} generated, {} duplicates, "
+                "{} pruned, peak frontier {}, peak visited {}, max depth {}"
+                "\n{:.3f}s total: extensions {:.3f}s, is_solved {:.3f}s, "
+                "fail_fast {:.3f}s, state_key {:.3f}s").format(
+                    self.expanded, self.expansion_rate(), self.generated,
+                    self.duplicates, self.pruned, self.peak_frontier,
+                    self.peak_visited, self.max_depth, self.wall_time,
+                    self.extensions_time, self.is_solved_time,
+                    self.fail_fast_time, self.state_key_time)
+
+    # timed and counted stand-ins for the Puzzle methods solvers call
+
+    def _is_solved(self, puzzle):
+        start = perf_counter()
+        solved = puzzle.is_solved()
+        self.is_solved_time += perf_counter() - start
+        return solved
+
+    def _fail_fast(self, puzzle):
+        start = perf_counter()
+        failed = puzzle.fail_fast()
+        self.fail_fast_time += perf_counter() - start
+        if failed:
+            self.pruned += 1
+        return failed
+
+    def _state_key(self, puzzle):
+        start = perf_counter()
+        key = puzzle.state_key()
+        self.state_key_time += perf_counter() - start
+        return key
+
+    def _timed(self, method, generates=False):
+        # Return method timed as part of extensions_time, each call
+        # counted as generating an extension if generates is true.
+        def timed(*args):
+            start = perf_counter()
+            result = method(*args)
+            self.extensions_time += perf_counter() - start
+            if generates:
+                self.generated += 1
+            return result
+        return timed
 
+    def _iter_extensions(self, puzzle):
+        extensions = puzzle.iter_extensions()
+        while True:
+            start = perf_counter()
+            child = next(extensions, None)
+            self.extensions_time += perf_counter() - start
+            if child is None:
+                return
+            self.generated += 1
+            yield child
 
 if __name__ == '__main__':
     #import doctest
     #doctest.testmod()    
-    file = open('words.txt', 'r', encoding = 'utf-8')
-    word_set = set(file.read().split())
-    w = WordLadderPuzzle('cove', 'cost', word_set)
+    from lexicon import load_lexicon
+    w = WordLadderPuzzle('cove', 'cost', load_lexicon('words.txt'))
     x = depth_first_solve(w)
     print(x)
     grid = ["*", "B", "C", "*"]
@@ -0,0 +1,240 @@
+"""
+Checking many sudoku grids at once with NumPy.
+
+A batch of N nxn grids is an integer array of shape (N, n, n), holding 0
+for an empty position and v for the v-th symbol of the sorted symbol set,
+so from_puzzles and to_puzzles convert between it and SudokuPuzzles.
+Symbol v stands for bit v - 1 of a candidate mask.
+
+Needs NumPy 2 (see requirements.txt), which the rest of the package does
+not.
+"""
+import numpy as np
+from sudoku_puzzle import SudokuPuzzle
+
+
+def from_puzzles(puzzles):
+    """
+    Return the batch of the grids of SudokuPuzzles puzzles, which must all
+    be the same size.
+
+    @type puzzles: list[SudokuPuzzle]
+    @rtype: numpy.ndarray
+
+    >>> s = SudokuPuzzle(4, ["B", "*", "*", "A"] * 4, {"A", "B", "C", "D"})
+    >>> from_puzzles([s])[0, 0].tolist()
+    [2, 0, 0, 1]
+    """
+    n = puzzles[0]._n
+    grids = np.array([list(p._cells) for p in puzzles], dtype=np.int64)
+    return grids.reshape(len(puzzles), n, n)
+
+
+def to_puzzles(grids, symbol_set):
+    """
+    Return a SudokuPuzzle with symbols from symbol_set for each grid in
+    batch grids.
+
+    @type grids: numpy.ndarray
+    @type symbol_set: set[str]
+    @rtype: list[SudokuPuzzle]
+
+    >>> grids = np.zeros((2, 4, 4), dtype=np.int64)
+    >>> grids[1, 0, 0] = 3
+    >>> s = to_puzzles(grids, {"A", "B", "C", "D"})[1]
+    >>> str(s).split()[0]
+    'C*|**'
+    """
+    n = grids.shape[1]
+    order = ["*"] + sorted(symbol_set)
+    return [SudokuPuzzle(n, [order[v] for v in grid], symbol_set)
+            for grid in grids.reshape(len(grids), n * n).tolist()]
+
+
+def validate(grids):
+    """
+    Return, for each grid in batch grids, whether it only holds values
+    from 0 to n and repeats no symbol in a row, column or subsquare.
+
+    @type grids: numpy.ndarray
+    @rtype: numpy.ndarray
+
+    >>> grids = np.zeros((3, 4, 4), dtype=np.int64)
+    >>> grids[1, 0, 0] = grids[1, 3, 0] = 2
+    >>> grids[2, 0, 0] = 5
+    >>> validate(grids).tolist()
+    [True, False, False]
+    """
+    n = _size(grids)
+    in_range = ((grids >= 0) & (grids <= n)).all(axis=(1, 2))
+    bits = _bits(np.where(in_range[:, None, None], grids, 0))
+    # a unit's bits only add up to their bitwise or when none is repeated
+    repeated = np.zeros(len(grids), dtype=bool)
+    for unit in _units(bits):
+        repeated |= (unit.sum(axis=-1) !=
+                     np.bitwise_or.reduce(unit, axis=-1)).any(axis=-1)
+    return in_range & ~repeated
+
+
+def candidates(grids):
+    """
+    Return, for each position of each grid in batch grids, the mask of
+    symbols not yet used in its row, column or subsquare, or 0 if the
+    position is filled.  The grids should be valid.
+
+    @type grids: numpy.ndarray
+    @rtype: numpy.ndarray
+
+    >>> grids = np.zeros((1, 4, 4), dtype=np.int64)
+    >>> grids[0, 0, :3] = [1, 2, 3]
+    >>> candidates(grids)[0, 0].tolist()
+    [0, 0, 0, 8]
+    >>> candidates(grids)[0, 1].tolist()
+    [12, 12, 11, 11]
+    """
+    n = _size(grids)
+    used = _spread([np.bitwise_or.reduce(unit, axis=-1)
+                    for unit in _units(_bits(grids))])
+    return np.where(grids == 0, ((1 << n) - 1) & ~used, 0).astype(np.int32)
+
+
+def forced(grids, cands=None):
+    """
+    Return, for each position of each grid in batch grids, the symbol it
+    is forced to hold, or 0 if it is filled or not forced.  A position is
+    forced when it has one candidate left (a naked single), or it is the
+    only place in its row, column or subsquare for a candidate (a hidden
+    single).  cands are the grids' candidates, if already computed.
+
+    @type grids: numpy.ndarray
+    @type cands: numpy.ndarray | None
+    @rtype: numpy.ndarray
+
+    >>> grids = np.zeros((1, 4, 4), dtype=np.int64)
+    >>> grids[0, 0, :3] = [1, 2, 3]
+    >>> grids[0, 2, 2], grids[0, 3, 3] = 4, 2
+    >>> forced(grids)[0].tolist()
+    [[0, 0, 0, 4], [0, 0, 2, 0], [2, 0, 0, 3], [0, 0, 1, 0]]
+    """
+    if cands is None:
+        cands = candidates(grids)
+    single = np.where(np.bitwise_count(cands) == 1, cands,
+                      cands & _only_places(cands))
+    # a position forced to two symbols at once is left for infeasible
+    single = np.where(np.bitwise_count(single) == 1, single, 0)
+    return np.where(single > 0, np.bitwise_count(single - 1) + 1,
+                    0).astype(grids.dtype)
+
+
+def infeasible(grids, cands=None):
+    """
+    Return, for each grid in batch grids, whether it certainly has no
+    solution: it is not valid, an empty position has no candidates, a
+    symbol has no place left in some row, column or subsquare, or some
+    position is the only place for two symbols.  cands are the grids'
+    candidates, if already computed.
+
+    @type grids: numpy.ndarray
+    @type cands: numpy.ndarray | None
+    @rtype: numpy.ndarray
+
+    >>> grids = np.zeros((3, 4, 4), dtype=np.int64)
+    >>> grids[1, 0, :2] = [1, 2]
+    >>> grids[1, 1, 2] = 3
+    >>> grids[2, 0, 0] = grids[2, 0, 3] = 1
+    >>> infeasible(grids).tolist()
+    [False, True, True]
+    """
+    n = _size(grids)
+    valid = validate(grids)
+    grids = np.where(valid[:, None, None], grids, 0)
+    if cands is None:
+        cands = candidates(grids)
+    full = (1 << n) - 1
+    dead = ((grids == 0) & (cands == 0)).any(axis=(1, 2))
+    # every symbol must be used in, or still possible for, every unit
+    for used, possible in zip(_units(_bits(grids)), _units(cands)):
+        placed = np.bitwise_or.reduce(used, axis=-1)
+        reachable = np.bitwise_or.reduce(possible, axis=-1)
+        dead |= ((placed | reachable) != full).any(axis=-1)
+    # and no position can be the only place for two symbols
+    crowded = np.bitwise_count(cands & _only_places(cands)) > 1
+    return ~valid | dead | crowded.any(axis=(1, 2))
+
+
+def _size(grids):
+    """
+    Return n for batch grids of nxn grids.
+
+    @type grids: numpy.ndarray
+    @rtype: int
+    """
+    assert grids.ndim == 3 and grids.shape[1] == grids.shape[2]
+    n = grids.shape[1]
+    assert round(n ** (1 / 2)) ** 2 == n
+    return n
+
+
+def _bits(grids):
+    """
+    Return the batch of masks with the bit of each position's symbol, or
+    0 for empty positions.
+
+    @type grids: numpy.ndarray
+    @rtype: numpy.ndarray
+    """
+    return np.where(grids > 0, np.left_shift(1, np.maximum(grids - 1, 0)),
+                    0).astype(np.int32)
+
+
+def _only_places(cands):
+    """
+    Return, for each position, the mask of symbols for which it is in a
+    row, column or subsquare with only one place left for them.
+
+    @type cands: numpy.ndarray
+    @rtype: numpy.ndarray
+    """
+    uniques = []
+    for unit in _units(cands):
+        # symbols possible in at least one, and in at least two, places
+        once = np.zeros_like(unit[:, :, 0])
+        twice = np.zeros_like(once)
+        for p in range(unit.shape[2]):
+            twice |= once & unit[:, :, p]
+            once |= unit[:, :, p]
+        uniques.append(once & ~twice)
+    return _spread(uniques)
+
+
+def _units(values):
+    """
+    Return values, a batch of per-position arrays, regrouped three ways:
+    by row, by column and by subsquare, each of shape (N, n, n) with the
+    positions of one unit along the last axis.
+
+    @type values: numpy.ndarray
+    @rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    count, n = len(values), values.shape[1]
+    ss = round(n ** (1 / 2))
+    subsquares = values.reshape(count, ss, ss, ss, ss).transpose(0, 1, 3, 2, 4)
+    return (values, values.transpose(0, 2, 1),
+            subsquares.reshape(count, n, n))
+
+
+def _spread(masks):
+    """
+    Return, for each position, the bitwise or of the masks of its row,
+    column and subsquare, given masks as arrays of shape (N, n) for rows,
+    columns and subsquares.
+
+    @type masks: list[numpy.ndarray]
+    @rtype: numpy.ndarray
+    """
+    rows, columns, subsquares = masks
+    count, n = rows.shape
+    ss = round(n ** (1 / 2))
+    return (rows[:, :, None] | columns[:, None, :] |
+            subsquares.reshape(count, ss, 1, ss, 1)
+            .repeat(ss, axis=2).repeat(ss, axis=4).reshape(count, n, n))
@@ -0,0 +1,298 @@
+"""
+Exact-cover solving of SudokuPuzzles with Algorithm X and dancing links.
+
+A sudoku is the exact-cover problem of choosing one (position, symbol)
+pair per empty position so that every position, and every symbol of every
+row, column and subsquare, is covered once.  The links are kept in flat
+lists of node indices rather than in node objects.
+"""
+from puzzle_tools import PuzzleNode
+from sudoku_puzzle import SudokuPuzzle
+
+
+class ExactCover:
+    """
+    A sparse 0-1 matrix whose sets of rows covering every column exactly
+    once can be searched for.
+
+    A search changes the links while it runs, and puts them back as it
+    finishes, so an ExactCover supports one search at a time, and none
+    after a search is abandoned part way.
+    """
+
+    def __init__(self, columns, rows):
+        """
+        Create the ExactCover self with columns columns and a row for each
+        list of column indices in rows.
+
+        @type self: ExactCover
+        @type columns: int
+        @type rows: list[list[int]]
+        @rtype: None
+        """
+        # node 0 is the root, nodes 1..columns the column headers, and the
+        # rest the 1s of the matrix; left, right, up and down give each
+        # node's neighbours, column its header, and row its row
+        self._left = [c - 1 for c in range(columns + 1)]
+        self._right = [c + 1 for c in range(columns + 1)]
+        self._left[0], self._right[columns] = columns, 0
+        self._up = list(range(columns + 1))
+        self._down = list(range(columns + 1))
+        self._column = list(range(columns + 1))
+        self._row = [-1] * (columns + 1)
+        self._size = [0] * (columns + 1)
+        left, right, up, down = self._left, self._right, self._up, self._down
+        for r, row in enumerate(rows):
+            first = len(left)
+            for c in row:
+                x, c = len(left), c + 1
+                up.append(up[c])
+                down.append(c)
+                down[up[c]], up[c] = x, x
+                left.append(x - 1)
+                right.append(first)
+                if x > first:
+                    right[x - 1] = x
+                self._column.append(c)
+                self._row.append(r)
+                self._size[c] += 1
+            if len(left) > first:
+                left[first] = len(left) - 1
+
+    def solutions(self):
+        """
+        Yield each set of rows of ExactCover self covering every column
+        exactly once, as a list of row indices.
+
+        @type self: ExactCover
+        @rtype: generator[list[int]]
+
+        >>> e = ExactCover(3, [[0, 1], [2], [1, 2], [0]])
+        >>> sorted([sorted(rows) for rows in e.solutions()])
+        [[0, 1], [2, 3]]
+        >>> list(ExactCover(2, [[0]]).solutions())
+        []
+        """
+        right, down, column = self._right, self._down, self._column
+        size, chosen = self._size, []
+        while True:
+            advanced = False
+            if not right[0]:
+                yield [self._row[x] for x in chosen]
+            else:
+                # branch on the column with the fewest rows left
+                c, best = right[0], right[0]
+                while c and size[best] > 1:
+                    if size[c] < size[best]:
+                        best = c
+                    c = right[c]
+                if size[best]:
+                    self._cover(best)
+                    chosen.append(down[best])
+                    self._cover_row(down[best])
+                    advanced = True
+            # backtrack to the deepest choice with another row to try
+            while not advanced and chosen:
+                x = chosen.pop()
+                self._uncover_row(x)
+                if down[x] != column[x]:
+                    chosen.append(down[x])
+                    self._cover_row(down[x])
+                    advanced = True
+                else:
+                    self._uncover(column[x])
+            if not advanced:
+                return
+
+    def _cover(self, c):
+        # Take column c out of the header list, and its rows out of every
+        # other column.
+        #
+        # @type self: ExactCover
+        # @type c: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        right[left[c]], left[right[c]] = right[c], left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]], up[down[j]] = down[j], up[j]
+                self._size[self._column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c):
+        # Undo _cover(c).
+        #
+        # @type self: ExactCover
+        # @type c: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                self._size[self._column[j]] += 1
+                down[up[j]], up[down[j]] = j, j
+                j = left[j]
+            i = up[i]
+        right[left[c]], left[right[c]] = c, c
+
+    def _cover_row(self, x):
+        # Cover the columns of node x's row other than x's own.
+        #
+        # @type self: ExactCover
+        # @type x: int
+        # @rtype: None
+        j = self._right[x]
+        while j != x:
+            self._cover(self._column[j])
+            j = self._right[j]
+
+    def _uncover_row(self, x):
+        # Undo _cover_row(x).
+        #
+        # @type self: ExactCover
+        # @type x: int
+        # @rtype: None
+        j = self._left[x]
+        while j != x:
+            self._uncover(self._column[j])
+            j = self._left[j]
+
+
+def solutions(puzzle, limit=None):
+    """
+    Yield the symbols of each solution of SudokuPuzzle puzzle, at most
+    limit of them if limit is given.
+
+    @type puzzle: SudokuPuzzle
+    @type limit: int | None
+    @rtype: generator[list[str]]
+
+    >>> grid = ["A", "*", "C", "*"]
+    >>> grid += ["*", "D", "*", "B"]
+    >>> grid += ["B", "*", "D", "*"]
+    >>> grid += ["*", "C", "*", "A"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> list(solutions(s))[0][:8]
+    ['A', 'B', 'C', 'D', 'C', 'D', 'A', 'B']
+    """
+    symbols, (matrix, choices) = puzzle._symbols, _exact_cover(puzzle)
+    if matrix is None or limit == 0:
+        return
+    found = 0
+    for rows in matrix.solutions():
+        solution = symbols[:]
+        for r in rows:
+            position, symbol = choices[r]
+            solution[position] = symbol
+        yield solution
+        found += 1
+        if found == limit:
+            return
+
+
+def count_solutions(puzzle, limit=None):
+    """
+    Return the number of solutions of SudokuPuzzle puzzle, counting no
+    further than limit if it is given.
+
+    count_solutions(puzzle, 2) == 1 checks that puzzle has exactly one
+    solution without enumerating the rest.
+
+    @type puzzle: SudokuPuzzle
+    @type limit: int | None
+    @rtype: int
+
+    >>> s = SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})
+    >>> count_solutions(s)
+    288
+    >>> count_solutions(s, 2)
+    2
+    """
+    return sum([1 for _ in solutions(puzzle, limit)])
+
+
+def dlx_solve(puzzle):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, in the shape depth_first_solve returns, or None if there
+    is no solution.  Each step fills one empty position, in order.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: PuzzleNode | None
+
+    >>> grid = ["A", "*", "C", "*"]
+    >>> grid += ["*", "D", "*", "B"]
+    >>> grid += ["B", "*", "D", "*"]
+    >>> grid += ["*", "C", "*", "A"]
+    >>> node = dlx_solve(SudokuPuzzle(4, grid, {"A", "B", "C", "D"}))
+    >>> length = 0
+    >>> while node.children:
+    ...     node, length = node.children[0], length + 1
+    >>> node.puzzle.is_solved(), length
+    (True, 8)
+    >>> grid[1] = "A"
+    >>> print(dlx_solve(SudokuPuzzle(4, grid, {"A", "B", "C", "D"})))
+    None
+    """
+    solution = next(solutions(puzzle, 1), None)
+    if solution is None:
+        return None
+    root = node = PuzzleNode(puzzle)
+    symbols = puzzle._symbols
+    for position in range(len(symbols)):
+        if symbols[position] == "*":
+            symbols[position] = solution[position]
+            child = PuzzleNode(SudokuPuzzle(puzzle._n, symbols[:],
+                                            puzzle._symbol_set),
+                               None, node)
+            node.children.append(child)
+            node = child
+    return root
+
+
+def _exact_cover(puzzle):
+    """
+    Return the ExactCover of filling in SudokuPuzzle puzzle, with the
+    (position, symbol) each of its rows stands for, or (None, None) if
+    the symbols already in puzzle clash.
+
+    Only the constraints not already met by puzzle's symbols get columns,
+    and only the placements clashing with none of them get rows.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: (ExactCover | None, list[(int, str)] | None)
+    """
+    n, symbols = puzzle._n, puzzle._symbols
+    ss = round(n ** (1 / 2))
+    order = sorted(puzzle._symbol_set)
+
+    def constraints(position, v):
+        # the position, then symbol v in the row, column and subsquare
+        r, c = position // n, position % n
+        return (position, n * n + r * n + v, 2 * n * n + c * n + v,
+                3 * n * n + ((r // ss) * ss + c // ss) * n + v)
+
+    met = set()
+    for position in range(n * n):
+        if symbols[position] != "*":
+            placed = constraints(position, order.index(symbols[position]))
+            if any([k in met for k in placed]):
+                return None, None
+            met.update(placed)
+    columns = {}
+    for k in range(4 * n * n):
+        if k not in met:
+            columns[k] = len(columns)
+    rows, choices = [], []
+    for position in range(n * n):
+        if symbols[position] == "*":
+            for v in range(n):
+                placed = constraints(position, v)
+                if not any([k in met for k in placed]):
+                    rows.append([columns[k] for k in placed])
+                    choices.append((position, order[v]))
+    return ExactCover(len(columns), rows), choices
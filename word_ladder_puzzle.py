@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from lexicon import Lexicon, lexicon_of
 
 
 class WordLadderPuzzle(Puzzle):
@@ -12,15 +13,18 @@ class WordLadderPuzzle(Puzzle):
         from from_word to to_word using words in ws, changing one
         character at each step.
 
+        ws may be a set of words, or a Lexicon indexing them; a set is
+        indexed once, by the Lexicon shared by every puzzle using it.
+
         @type from_word: str
         @type to_word: str
-        @type ws: set[str]
+        @type ws: set[str] | Lexicon
         @rtype: None
         """
         (self._from_word, self._to_word, self._word_set) = (from_word,
                                                             to_word, ws)
-        # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        # index of the words 1-character changes lead to
+        self._lexicon = lexicon_of(ws)
 
         # TODO
         # implement __eq__ and __str__
@@ -35,12 +39,31 @@ class WordLadderPuzzle(Puzzle):
         
         >>> w1 = WordLadderPuzzle("soul", "cost", {'case', 'cave' 'same'})
         >>> w2 = WordLadderPuzzle("soul", "cost", {'case', 'cave' 'same'})
-        >>> repr(w1) == repr(w2)
-        True 
+        >>> w1 == w2
+        True
+        >>> w3 = WordLadderPuzzle("cost", "soul", {'case', 'cave' 'same'})
+        >>> w1 == w3
+        False
         """
-        return type(self), self._from_word, self._to_word, self._word_set == \
-               type(other), other._from_word, other._to_word, other._word_set
-    
+        return (Puzzle.__eq__(self, other) and
+                self._to_word == other._to_word and
+                (self._word_set is other._word_set or
+                 self._word_set == other._word_set))
+
+    __hash__ = Puzzle.__hash__
+
+    def state_key(self):
+        """
+        Return a hashable key for the current word of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> WordLadderPuzzle("hot", "hat", {'hit', 'hat', 'hot'}).state_key()
+        'hot'
+        """
+        return self._from_word
+
     def __str__(self):
         """
         Return a string representtion of WordLadderPuzzle self.
@@ -70,33 +93,99 @@ class WordLadderPuzzle(Puzzle):
     # override extensions
     # legal extensions are WordLadderPuzzles that have a from_word that can
     # be reached from this one by changing a single letter to one of those
-    # in self._chars
-    def extensions(self):
+    # in lexicon.LETTERS
+    def iter_extensions(self):
         """
-        Return a list of extensions of WordLadderPuzzle self.
-        
+        Yield the extensions of WordLadderPuzzle self one at a time.
+
         @type self: WordLadderPuzzle
-        @rtype: list[Puzzle]
+        @rtype: generator[WordLadderPuzzle]
+
+        >>> w = WordLadderPuzzle("hot", "hat", {'hit', 'hat', 'hot'})
+        >>> sorted([x.state_key() for x in w.iter_extensions()])
+        ['hat', 'hit']
         """
-        
-        word = list(self._from_word)
-        original = word[:]
-        index = 0
-        possible_words= []
-        for i in range(len(self._from_word)):            
-            for char in self._chars:
-                word[i] = char
-                if ''.join(word) in self._word_set:
-                    possible_words.append(''.join(word))
-                word = original[:]
-        
-        puzzle_list = []
-        for word in possible_words:
-            if word != self._from_word:
-                puzzle_list.append(WordLadderPuzzle(word, self._to_word, 
-                                                    self._word_set))
-        return puzzle_list      
-        
+        for candidate in self._lexicon.neighbours(self._from_word):
+            yield self._step(candidate)
+
+    def _step(self, word):
+        """
+        Return the WordLadderPuzzle that is self stepped to word, sharing
+        self's word set and Lexicon rather than looking the Lexicon up.
+
+        @type self: WordLadderPuzzle
+        @type word: str
+        @rtype: WordLadderPuzzle
+        """
+        child = WordLadderPuzzle.__new__(WordLadderPuzzle)
+        child._from_word, child._to_word = word, self._to_word
+        child._word_set, child._lexicon = self._word_set, self._lexicon
+        return child
+
+    def moves(self):
+        """
+        Return the words WordLadderPuzzle self can step to, in the order
+        of its extensions.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[str]
+
+        >>> WordLadderPuzzle("hot", "hat", {'hit', 'hat', 'hot'}).moves()
+        ['hat', 'hit']
+        """
+        return self._lexicon.neighbours(self._from_word)
+
+    def apply(self, move):
+        """
+        Step WordLadderPuzzle self, a copy, to the word move.
+
+        @type self: WordLadderPuzzle
+        @type move: str
+        @rtype: None
+
+        >>> w = WordLadderPuzzle("hot", "hat", {'hit', 'hat', 'hot'}).copy()
+        >>> w.apply("hit")
+        >>> w.state_key(), w.inverse("hit")
+        ('hit', 'hot')
+        >>> w.undo("hit")
+        >>> w.state_key()
+        'hot'
+        """
+        self._steps.append(self._from_word)
+        self._from_word = move
+
+    def undo(self, move):
+        """
+        Step WordLadderPuzzle self back from the word move.
+
+        @type self: WordLadderPuzzle
+        @type move: str
+        @rtype: None
+        """
+        self._from_word = self._steps.pop()
+
+    def inverse(self, move):
+        """
+        Return the word WordLadderPuzzle self stepped to move from.
+
+        @type self: WordLadderPuzzle
+        @type move: str
+        @rtype: str
+        """
+        return self._steps[-1]
+
+    def copy(self):
+        """
+        Return a copy of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+        """
+        copy = self._step(self._from_word)
+        # the words stepped from by apply, most recent last
+        copy._steps = []
+        return copy
+
 
     # TODO
     # override is_solved
@@ -116,15 +205,151 @@ class WordLadderPuzzle(Puzzle):
         """
         return self._from_word == self._to_word
     
-    
+
+    def fail_fast(self):
+        """
+        Return whether WordLadderPuzzle self certainly has no solution:
+        its words differ in length, one of them is not in the word set,
+        or they are in different connected components of the graph of
+        one letter changes.  Each check takes constant time once the
+        components of words of that length are known.
+
+        @type self: WordLadderPuzzle
+        @rtype: bool
+
+        >>> ws = {"hot", "hat", "cat", "dog", "dot", "pig"}
+        >>> WordLadderPuzzle("cat", "dog", ws).fail_fast()
+        False
+        >>> WordLadderPuzzle("cat", "pig", ws).fail_fast()
+        True
+        >>> WordLadderPuzzle("cat", "cow", ws).fail_fast()
+        True
+        >>> WordLadderPuzzle("cat", "dogs", ws).fail_fast()
+        True
+        """
+        if self._from_word == self._to_word:
+            return False
+        if len(self._from_word) != len(self._to_word):
+            return True
+        component = self._lexicon.component(self._from_word)
+        return (component is None or
+                component != self._lexicon.component(self._to_word))
+
+    def reverse(self):
+        """
+        Return the WordLadderPuzzle from _to_word to _from_word of
+        WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+
+        >>> WordLadderPuzzle("hot", "hat", {'hit', 'hat', 'hot'}).reverse()
+        From word: hat, To word: hot
+        """
+        return WordLadderPuzzle(self._to_word, self._from_word, self._word_set)
+
+    def share(self):
+        """
+        Register WordLadderPuzzle self's word set, so that pickled
+        WordLadderPuzzles using it only refer to it until unshare is
+        called as many times.  Only processes that inherit the
+        registration by forking can unpickle them.  A Lexicon is not
+        registered, since it pickles by reference already when it was
+        loaded by load_lexicon.
+
+        @type self: WordLadderPuzzle
+        @rtype: None
+
+        >>> import pickle
+        >>> ws = {'hit', 'hat', 'hot'}
+        >>> w = WordLadderPuzzle("hot", "hat", ws)
+        >>> w.share()
+        >>> pickle.loads(pickle.dumps(w))._word_set is ws
+        True
+        >>> w.unshare()
+        >>> copy = pickle.loads(pickle.dumps(w))
+        >>> copy._word_set is ws, copy._word_set == ws
+        (False, True)
+        """
+        if isinstance(self._word_set, Lexicon):
+            return
+        entry = _shared_word_sets.get(id(self._word_set))
+        if entry is None or entry[0] is not self._word_set:
+            entry = _shared_word_sets[id(self._word_set)] = [self._word_set,
+                                                             0]
+        entry[1] += 1
+
+    def unshare(self):
+        """
+        Undo one call of share on WordLadderPuzzle self, forgetting its
+        word set once every call has been undone.
+
+        @type self: WordLadderPuzzle
+        @rtype: None
+        """
+        entry = _shared_word_sets.get(id(self._word_set))
+        if entry is not None and entry[0] is self._word_set:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _shared_word_sets[id(self._word_set)]
+
+    def __reduce__(self):
+        """
+        Return how to pickle WordLadderPuzzle self, referring to its word
+        set by id if it has been shared.
+
+        @type self: WordLadderPuzzle
+        @rtype: tuple
+        """
+        entry = _shared_word_sets.get(id(self._word_set))
+        if entry is not None and entry[0] is self._word_set:
+            return (_shared_ladder, (self._from_word, self._to_word,
+                                     id(self._word_set)))
+        return (WordLadderPuzzle, (self._from_word, self._to_word,
+                                   self._word_set))
+
+    def heuristic(self):
+        """
+        Return the number of letters in which _from_word differs from
+        _to_word.  Each step changes one letter, so this never
+        overestimates the steps needed.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+
+        >>> WordLadderPuzzle("same", "cost", {'same', 'cost'}).heuristic()
+        4
+        """
+        return (sum([a != b for a, b in zip(self._from_word, self._to_word)])
+                + abs(len(self._from_word) - len(self._to_word)))
+
+
+# [word set, number of shares not yet undone] for each word set
+# registered by WordLadderPuzzle.share, by id
+_shared_word_sets = {}
+
+
+def _shared_ladder(from_word, to_word, word_set_id):
+    """
+    Return a WordLadderPuzzle using the shared word set with word_set_id.
+
+    @type from_word: str
+    @type to_word: str
+    @type word_set_id: int
+    @rtype: WordLadderPuzzle
+    """
+    return WordLadderPuzzle(from_word, to_word,
+                            _shared_word_sets[word_set_id][0])
+
 
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
-    from puzzle_tools import breadth_first_solve, depth_first_solve
+    from puzzle_tools import breadth_first_solve, depth_first_solve, \
+        bidirectional_solve
+    from lexicon import load_lexicon
     from time import time
-    with open("words.txt", "r", encoding = 'utf-8') as words:
-        word_set = set(words.read().split())
+    word_set = load_lexicon("words.txt")
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
     sol = breadth_first_solve(w)
@@ -138,3 +363,9 @@ if __name__ == '__main__':
     print("Solving word ladder from same->cost")
     print("...using depth-first-search")
     print("Solutions: {} took {} seconds.".format(sol, end - start))
+    start = time()
+    sol = bidirectional_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using bidirectional breadth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))